@@ -1,4 +1,71 @@
+import ast
+import functools
 import math
+import os
+import re
+from decimal import Context, Decimal, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, localcontext
+
+# 计算引擎："float" 为原有的浮点实现，"decimal" 使用 decimal 精确计算并直接格式化结果
+ENGINE = os.environ.get("FUNCHUB_ENGINE", "float")
+DECIMAL_CONTEXT = Context(prec=int(os.environ.get("FUNCHUB_PRECISION", 50)), rounding=ROUND_HALF_EVEN)
+QUANTUMS = [Decimal(1).scaleb(-places) for places in range(16)]
+
+
+def set_engine(engine="float", precision=None):
+    """
+    设置全局计算引擎
+
+    参数:
+        engine (str): "float"（默认，原有实现）或 "decimal"（精确十进制计算）
+        precision (int, 可选): decimal 引擎中间计算的有效数字位数，默认50
+
+    使用示例:
+        >>> set_engine("decimal", precision=80)
+        >>> divide_([1, 3])
+        "0.33"
+    """
+    global ENGINE, DECIMAL_CONTEXT
+    if engine not in ("float", "decimal"):
+        raise ValueError(f"Unknown engine: {engine}")
+    ENGINE = engine
+    if precision is not None:
+        DECIMAL_CONTEXT = Context(prec=precision, rounding=ROUND_HALF_EVEN)
+
+
+def to_decimal(x):
+    """
+    把数字转换为 Decimal：整数精确转换，浮点数按其最短十进制表示（即书写时的数字）转换
+    """
+    if isinstance(x, Decimal):
+        return x
+    if isinstance(x, float):
+        return Decimal(repr(x))
+    return Decimal(x)
+
+
+def with_engine(exact_args=True):
+    """
+    让工具函数可以按调用（engine 参数）或全局（set_engine）选择计算引擎
+
+    decimal 引擎下参数会先转换为 Decimal（exact_args=False 的整数函数除外），
+    并在 DECIMAL_CONTEXT 的精度下计算；结果恰好是舍入平局时改用 float 引擎计算。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(args, engine=None):
+            engine = engine or ENGINE
+            if engine == "float":
+                return func(args, engine)
+            if engine != "decimal":
+                raise ValueError(f"Unknown engine: {engine}")
+            try:
+                with localcontext(DECIMAL_CONTEXT):
+                    return func([to_decimal(arg) for arg in args] if exact_args else args, engine)
+            except RoundingTie:
+                return func(args, "float")
+        return wrapper
+    return decorator
+
 
 # this function is used to round the result to 2 decimal places
 # e.g. 52.3523 -> 52.35, 52.0011 -> 52, 0.00000233 -> 0.0000023
@@ -90,8 +157,96 @@ def scito_decimal(sci_str):
 
     return decimal_str
 
+class RoundingTie(ArithmeticError):
+    """decimal 引擎的结果恰好落在两个舍入结果中间（如 3.725 保留两位）"""
+
+
+# round a Decimal half up, refusing exact ties
+def quantize_exact(x, places):
+    """
+    把 Decimal 舍入到 places 位小数
+
+    恰好落在两个取值中间时抛出 RoundingTie：float 引擎在这种情况下的结果取决于计算过程中的
+    二进制误差（如 6.885+1.36+1.36 得到 9.6049999...），由工具函数改用 float 引擎计算以保持结果一致。
+    """
+    sign, digits, exponent = x.as_tuple()
+    if exponent >= -places:
+        # 小数位数本来就不超过 places，不需要舍入
+        return x
+    # 保证 quantize 的结果不会超出上下文精度
+    context = DECIMAL_CONTEXT if x.adjusted() + places < DECIMAL_CONTEXT.prec else \
+        Context(prec=x.adjusted() + places + 2)
+    quantum = QUANTUMS[places] if places < len(QUANTUMS) else Decimal(1).scaleb(-places)
+    up = x.quantize(quantum, rounding=ROUND_HALF_UP, context=context)
+    # 只有恰好多一位小数且这一位（去掉末尾的 0 后）是 5 时才可能是平局
+    if exponent == -places - 1 or (digits[-1] == 0 and x.normalize(context).as_tuple().exponent == -places - 1):
+        if up != x.quantize(quantum, rounding=ROUND_HALF_DOWN, context=context):
+            raise RoundingTie(f"{x} is a rounding tie")
+    return up
+
+# custom_round for the decimal engine: same choice of decimal places, no string round trip
+def decimal_round(x, decimal_places=2):
+    """
+    custom_round 的 Decimal 版本
+
+    与 custom_round 使用相同的规则决定保留的小数位数（按保留10位小数后的前导零个数），
+    但直接在 Decimal 上用 quantize 舍入，不经过字符串，也不会丢失大数或极小数的精度。
+
+    参数:
+        x (Decimal): 需要四舍五入的数字
+        decimal_places (int, 可选): 默认保留的小数位数，默认为2
+
+    返回值:
+        Decimal: 四舍五入后的数字
+
+    使用示例:
+        >>> decimal_round(Decimal("52.3523"))
+        Decimal('52.35')
+        >>> decimal_round(Decimal("0.00000233"))
+        Decimal('0.0000023')
+    """
+    # 与 f"{x:.10f}" 一致：负数的整数部分是 "-0"，不按前导零处理
+    if not x.is_signed() and x < 1:
+        ten = quantize_exact(x, 10)
+        if ten < 1:
+            leading_zeros = 10 if ten == 0 else -ten.adjusted() - 1
+            if leading_zeros >= 1:
+                decimal_places = leading_zeros + 2
+    return quantize_exact(x, decimal_places)
+
+# normalize for the decimal engine: fixed-point formatting, never scientific notation
+def normalize_decimal(res, round_to=2):
+    """
+    decimal 引擎的标准化函数
+
+    整数结果直接转为字符串；其余结果用 decimal_round 舍入后按定点格式输出并移除尾随零，
+    不会出现科学计数法。结果为零时不带符号（Decimal 的 -0 以及舍入为零的负数都输出 "0"）。
+
+    参数:
+        res (int | float | Decimal): 需要标准化的数字结果
+        round_to (int, 可选): 四舍五入的小数位数，默认为2
+
+    返回值:
+        str: 标准化后的字符串表示
+
+    使用示例:
+        >>> normalize_decimal(Decimal("3.14159"))
+        "3.14"
+        >>> normalize_decimal(Decimal("1.5E+20"))
+        "150000000000000000000"
+    """
+    if isinstance(res, int):
+        return str(res)
+    res = decimal_round(to_decimal(res), round_to)
+    if res.is_zero():
+        return "0"
+    res = format(res, "f")
+    if "." in res:
+        res = res.rstrip("0").rstrip(".")
+    return res
+
 # normalize the result to 2 decimal places and remove trailing zeros
-def normalize(res, round_to=2):
+def normalize(res, round_to=2, engine=None):
         """
         标准化数字结果，四舍五入并移除尾随零
         
@@ -101,9 +256,14 @@ def normalize(res, round_to=2):
         参数:
             res (float): 需要标准化的数字结果
             round_to (int, 可选): 四舍五入的小数位数，默认为2
+            engine (str, 可选): "float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
         
         返回值:
-            str: 标准化后的字符串表示
+            str: 标准化后的字符串表示，结果为零时不带符号
+        
+        异常:
+            RoundingTie: decimal 引擎下结果恰好是舍入平局时抛出（工具函数会改用 float 引擎）
+            OverflowError: float 引擎下整数结果超过 INTEGER_MAX_BITS 位时抛出
         
         使用示例:
             >>> normalize(3.14159)
@@ -113,13 +273,22 @@ def normalize(res, round_to=2):
             >>> normalize(1.23e-4)
             "0.000123"
         """
+        if (engine or ENGINE) == "decimal":
+            return normalize_decimal(res, round_to)
+        # 整数结果不经过浮点数，直接输出（不会变成科学计数法）；超出 float 范围时与原实现一样抛出 OverflowError
+        if type(res) is int:
+            if res.bit_length() > INTEGER_MAX_BITS:
+                raise OverflowError(f"integer result too large to format ({res.bit_length()} bits)")
+            return format_integer(res)
+
         # we round the result to 2 decimal places
         res = custom_round(res, round_to)
+        # 舍入为零的负数和 -0.0 输出 "0"，与 decimal 引擎一致
+        if res == 0:
+            res = abs(res)
         res = str(res)
         if "." in res:
-            while res[-1] == "0":
-                res = res[:-1]
-            res = res.strip(".")
+            res = res.rstrip("0").strip(".")
         
         # scientific notation
         if "e" in res:
@@ -127,8 +296,29 @@ def normalize(res, round_to=2):
 
         return res
 
+# float 引擎的整数结果上限（与 float 的范围相同，约 1.8e308）；choose_/permutate_/gcd_/lcm_ 不受此限制
+INTEGER_MAX_BITS = 1024
+
+# format an integer exactly, also beyond the int -> str digit limit of Python 3.11+
+def format_integer(n):
+    """
+    把整数精确转换为字符串
+
+    超过 Python 3.11 起 int 转 str 的位数限制（默认4300位）时改用 Decimal 转换，
+    不修改全局的位数限制。
+
+    使用示例:
+        >>> format_integer(math.comb(10, 5))
+        "252"
+    """
+    try:
+        return str(n)
+    except ValueError:
+        return str(Decimal(n))
+
 # 1. add
-def add_(args):
+@with_engine()
+def add_(args, engine=None):
     """
     加法运算函数
     
@@ -136,6 +326,7 @@ def add_(args):
     
     参数:
         args (list): 包含数字的列表，如[1, 2, 3, 4]
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的加法结果字符串
@@ -147,10 +338,11 @@ def add_(args):
         "4"
     """
 
-    return normalize(sum(args))
+    return normalize(sum(args), engine=engine)
 
 # 2. subtract
-def subtract_(args):
+@with_engine()
+def subtract_(args, engine=None):
     """
     减法运算函数
     
@@ -159,6 +351,7 @@ def subtract_(args):
     
     参数:
         args (list): 包含数字的列表，第一个数字为被减数，后续为减数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的减法结果字符串
@@ -173,10 +366,11 @@ def subtract_(args):
     res = args[0]
     for arg in args[1:]:
         res -= arg
-    return normalize(res)
+    return normalize(res, engine=engine)
 
 # 3. multiply
-def multiply_(args):
+@with_engine()
+def multiply_(args, engine=None):
     """
     乘法运算函数
     
@@ -184,6 +378,7 @@ def multiply_(args):
     
     参数:
         args (list): 包含数字的列表，如[2, 3, 4]
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的乘法结果字符串
@@ -198,10 +393,11 @@ def multiply_(args):
     res = args[0]
     for arg in args[1:]:
         res *= arg
-    return normalize(res)
+    return normalize(res, engine=engine)
 
 # 4. divide
-def divide_(args):
+@with_engine()
+def divide_(args, engine=None):
     """
     除法运算函数
     
@@ -210,6 +406,7 @@ def divide_(args):
     
     参数:
         args (list): 包含数字的列表，第一个数字为被除数，后续为除数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的除法结果字符串
@@ -227,10 +424,11 @@ def divide_(args):
     res = args[0]
     for arg in args[1:]:
         res /= arg
-    return normalize(res)
+    return normalize(res, engine=engine)
 
 # 5. power
-def power_(args):
+@with_engine()
+def power_(args, engine=None):
     """
     幂运算函数
     
@@ -239,6 +437,7 @@ def power_(args):
     
     参数:
         args (list): 包含数字的列表，第一个数字为底数，后续为指数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的幂运算结果字符串
@@ -250,15 +449,23 @@ def power_(args):
         "25"
         >>> power_([2, 3, 2])  # 2^(3^2) = 2^9 = 512
         "512"
+
+    异常:
+        OverflowError: 结果超出 float 范围时抛出；整数的幂在计算之前就按位数估计拒绝
     """
         
     res = args[0]
     for arg in args[1:]:
+        # 整数的幂不会溢出，超大的结果要先计算很久再在 normalize 中被拒绝
+        if type(res) is int and type(arg) is int and arg > 0 and \
+                (abs(res).bit_length() - 1) * arg > INTEGER_MAX_BITS:
+            raise OverflowError(f"integer power too large ({res.bit_length()}-bit base ** {arg})")
         res **= arg
-    return normalize(res)
+    return normalize(res, engine=engine)
 
 # 6. square root
-def sqrt_(args):
+@with_engine()
+def sqrt_(args, engine=None):
     """
     平方根运算函数
     
@@ -266,6 +473,7 @@ def sqrt_(args):
     
     参数:
         args (list): 包含一个数字的列表，该数字为需要开平方根的数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的平方根结果字符串
@@ -282,10 +490,11 @@ def sqrt_(args):
         输入的数字必须为非负数，否则会引发数学错误
     """
     res = args[0]
-    return normalize(math.sqrt(res))
+    return normalize(res.sqrt() if engine == "decimal" else math.sqrt(res), engine=engine)
 
 # 7. 10th log
-def log_(args):
+@with_engine()
+def log_(args, engine=None):
     """
     对数运算函数
     
@@ -297,6 +506,7 @@ def log_(args):
         args (list): 包含1-2个数字的列表
                     - 一个参数：[真数] -> log10(真数)
                     - 两个参数：[真数, 底数] -> log_底数(真数)
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的对数结果字符串
@@ -318,17 +528,18 @@ def log_(args):
     # if only one argument is passed, it is 10th log
     if len(args) == 1:
         res = args[0]
-        return normalize(math.log10(res))
+        return normalize(res.log10() if engine == "decimal" else math.log10(res), engine=engine)
     # if two arguments are passed, it is log with base as the second argument   
     elif len(args) == 2:
         res = args[0]
         base = args[1]
-        return normalize(math.log(res, base))
+        return normalize(res.ln() / base.ln() if engine == "decimal" else math.log(res, base), engine=engine)
     else:
         raise Exception("Invalid number of arguments passed to log function")
 
 # 8. natural log
-def ln_(args):
+@with_engine()
+def ln_(args, engine=None):
     """
     自然对数运算函数
     
@@ -336,6 +547,7 @@ def ln_(args):
     
     参数:
         args (list): 包含一个数字的列表，该数字为真数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的自然对数结果字符串
@@ -352,11 +564,12 @@ def ln_(args):
         输入的数字必须大于0，否则会引发数学错误
     """
     res = args[0]
-    return normalize(math.log(res))
+    return normalize(res.ln() if engine == "decimal" else math.log(res), engine=engine)
 
 
 # 9. choose
-def choose_(args):
+@with_engine(exact_args=False)
+def choose_(args, engine=None):
     """
     组合数运算函数（C(n,r)）
     
@@ -367,6 +580,7 @@ def choose_(args):
         args (list): 包含两个整数的列表 [n, r]
                     - n: 总元素个数
                     - r: 选择的元素个数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的组合数结果字符串
@@ -380,14 +594,15 @@ def choose_(args):
         "20"
     
     注意:
-        n >= r >= 0，且n和r都必须是非负整数
+        n >= r >= 0，且n和r都必须是非负整数，结果按整数精确计算
     """
     n = args[0]
     r = args[1]
-    return normalize(math.comb(n, r))
+    return format_integer(math.comb(n, r))
 
 # 10. permutation
-def permutate_(args):
+@with_engine(exact_args=False)
+def permutate_(args, engine=None):
     """
     排列数运算函数（P(n,r)）
     
@@ -398,6 +613,7 @@ def permutate_(args):
         args (list): 包含两个整数的列表 [n, r]
                     - n: 总元素个数
                     - r: 选择并排列的元素个数
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的排列数结果字符串
@@ -411,14 +627,15 @@ def permutate_(args):
         "6"
     
     注意:
-        n >= r >= 0，且n和r都必须是非负整数
+        n >= r >= 0，且n和r都必须是非负整数，结果按整数精确计算
     """
     n = args[0]
     r = args[1]
-    return normalize(math.perm(n, r))
+    return format_integer(math.perm(n, r))
 
 # 11. greatest common divisor
-def gcd_(args):
+@with_engine(exact_args=False)
+def gcd_(args, engine=None):
     """
     最大公约数运算函数
     
@@ -427,6 +644,7 @@ def gcd_(args):
     
     参数:
         args (list): 包含整数的列表，如[12, 18, 24]
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的最大公约数结果字符串
@@ -440,15 +658,13 @@ def gcd_(args):
         "5"
     
     注意:
-        所有输入的数字都应该是正整数
+        所有输入的数字都应该是整数，结果总是非负的
     """
-    res = args[0]
-    for arg in args[1:]:
-        res = math.gcd(res, arg)
-    return normalize(res)
+    return format_integer(math.gcd(*args))
 
 # 12. least common multiple
-def lcm_(args):
+@with_engine(exact_args=False)
+def lcm_(args, engine=None):
     """
     最小公倍数运算函数
     
@@ -457,6 +673,7 @@ def lcm_(args):
     
     参数:
         args (list): 包含整数的列表，如[4, 6, 8]
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的最小公倍数结果字符串
@@ -470,15 +687,14 @@ def lcm_(args):
         "24"
     
     注意:
-        所有输入的数字都应该是正整数
+        所有输入的数字都应该是整数，结果总是非负的，
+        任一参数为0时结果为0
     """
-    res = args[0]
-    for arg in args[1:]:
-        res = res * arg // math.gcd(res, arg)
-    return normalize(res)
+    return format_integer(math.lcm(*args))
 
 # 13. remainder
-def remainder_(args):
+@with_engine()
+def remainder_(args, engine=None):
     """
     求余运算函数（取模运算）
     
@@ -489,6 +705,7 @@ def remainder_(args):
         args (list): 包含两个数字的列表 [被除数, 除数]
                     - 被除数: 要被除的数字
                     - 除数: 用来除的数字
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
     
     返回值:
         str: 标准化后的余数结果字符串
@@ -506,4 +723,140 @@ def remainder_(args):
     """
     dividend = args[0]
     divisor = args[1]
-    return normalize(dividend % divisor)
\ No newline at end of file
+    res = dividend % divisor
+    # Decimal 的余数与被除数同号，这里改为与 Python 一致（与除数同号）
+    if engine == "decimal" and res and (res < 0) != (divisor < 0):
+        res += divisor
+    return normalize(res, engine=engine)
+# 14. nested expression
+EXPRESSION_MAX_LENGTH = 1000
+EXPRESSION_MAX_NODES = 200
+EXPRESSION_MAX_EXPONENT = 10000
+# 中间结果的上限（二进制位数），约3011位十进制数字，低于 int 转 str 的默认位数限制（4300位）
+EXPRESSION_MAX_BITS = 10000
+EXPRESSION_MAX_DIGITS = int(EXPRESSION_MAX_BITS * math.log10(2)) + 1
+EXPRESSION_OPERATIONS = ("add", "subtract", "multiply", "divide", "power", "sqrt", "log", "ln",
+                         "choose", "permutate", "gcd", "lcm", "remainder")
+
+def expression_value(result, engine):
+    """
+    把工具函数返回的标准化字符串转换回数字，作为外层运算的参数
+    """
+    if engine == "decimal":
+        return Decimal(result)
+    return float(result) if "." in result else int(result)
+
+def magnitude(x):
+    """
+    log2|x|，用于在计算之前估计结果的大小（0 为 -inf）
+    """
+    if isinstance(x, Decimal):
+        if not x.is_finite():
+            return math.inf
+        return -math.inf if x.is_zero() else float(abs(x).log10()) * math.log2(10)
+    if x == 0:
+        return -math.inf
+    return math.log2(abs(x))
+
+def estimated_magnitude(name, args):
+    """
+    运算结果 log2|result| 的上界估计，只对会让结果快速变大的运算做估计
+    """
+    magnitudes = [magnitude(arg) for arg in args]
+    growth = sum(m for m in magnitudes if m > 0)
+    if name == "power" and args:
+        res = magnitudes[0]
+        for arg in args[1:]:
+            res = abs(res * float(arg))
+        return res
+    if name in ("multiply", "lcm"):
+        return growth
+    if name == "permutate" and len(args) == 2:
+        return float(args[1]) * max(magnitudes[0], 0)
+    if name == "choose" and len(args) == 2:
+        n, r = float(args[0]), float(args[1])
+        return min(n, min(r, n - r) * max(magnitudes[0], 0))
+    return max(magnitudes, default=0) + 1
+
+def check_size(name, args):
+    """
+    参数或（估计的）结果超过 EXPRESSION_MAX_BITS 时拒绝整个表达式，避免超大整数运算长时间不返回
+    """
+    if any(magnitude(arg) > EXPRESSION_MAX_BITS for arg in args) or \
+            estimated_magnitude(name, args) > EXPRESSION_MAX_BITS:
+        raise ValueError(f"Intermediate result of {name} too large in expression (limit {EXPRESSION_MAX_BITS} bits)")
+
+def call_operation(node, engine):
+    """
+    执行表达式中的一次运算调用，返回工具函数的标准化字符串结果
+    """
+    if not isinstance(node.func, ast.Name) or node.keywords:
+        raise ValueError(f"Unsupported call in expression: {ast.dump(node)}")
+    name = node.func.id.rstrip("_")
+    if name not in EXPRESSION_OPERATIONS:
+        raise ValueError(f"Unknown operation in expression: {node.func.id}")
+    arg_nodes = node.args
+    # 也接受 multiply([2, 3]) 这种与工具参数相同的列表写法
+    if len(arg_nodes) == 1 and isinstance(arg_nodes[0], ast.List):
+        arg_nodes = arg_nodes[0].elts
+    args = [evaluate_expression(arg, engine) for arg in arg_nodes]
+    if name == "power" and any(abs(arg) > EXPRESSION_MAX_EXPONENT for arg in args[1:]):
+        raise ValueError(f"Exponent too large in expression (limit {EXPRESSION_MAX_EXPONENT})")
+    check_size(name, args)
+    result = globals()[name + "_"](args, engine=engine)
+    if len(result.lstrip("-").split(".")[0]) > EXPRESSION_MAX_DIGITS:
+        raise ValueError(f"Intermediate result of {name} too large in expression (limit {EXPRESSION_MAX_BITS} bits)")
+    return result
+
+def evaluate_expression(node, engine):
+    """
+    递归计算表达式语法树，只允许数字、正负号和对上述运算的调用
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = evaluate_expression(node.operand, engine)
+        return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.Call):
+        return expression_value(call_operation(node, engine), engine)
+    raise ValueError(f"Unsupported element in expression: {ast.dump(node)}")
+
+def expression_(args, engine=None):
+    """
+    嵌套表达式运算函数
+    
+    在一次调用中计算由上述运算嵌套组成的表达式，如 divide(multiply(67,29),60)。
+    每一层运算都调用对应的工具函数并标准化结果，与逐步调用这些工具的多跳结果一致。
+    表达式通过语法树解析，不使用 eval，只允许数字、正负号和上述运算。
+    
+    参数:
+        args (str | list): 表达式字符串，或只包含表达式字符串的列表
+        engine (str, 可选): 计算引擎，"float" 或 "decimal"，默认使用 set_engine 设置的全局引擎
+    
+    返回值:
+        str: 标准化后的表达式结果字符串
+    
+    使用示例:
+        >>> expression_("divide(multiply(67,29),60)")
+        "32.38"
+        >>> expression_(["power(add(1,2),2)"])
+        "9"
+    
+    异常:
+        ValueError: 表达式过长、包含未知运算或不允许的语法，或中间结果超过 EXPRESSION_MAX_BITS 位时抛出
+    """
+    engine = engine or ENGINE
+    expression = args[0] if isinstance(args, list) and len(args) == 1 else args
+    if not isinstance(expression, str):
+        raise ValueError("expression_ expects an expression string")
+    # 兼容计算链中 <multiply>(67,29) 的写法
+    expression = re.sub(r"<(\w+)>", r"\1", expression.strip())
+    if len(expression) > EXPRESSION_MAX_LENGTH:
+        raise ValueError(f"Expression longer than {EXPRESSION_MAX_LENGTH} characters")
+    tree = ast.parse(expression, mode="eval")
+    if sum(1 for _ in ast.walk(tree)) > EXPRESSION_MAX_NODES:
+        raise ValueError(f"Expression has more than {EXPRESSION_MAX_NODES} elements")
+    if isinstance(tree.body, ast.Call):
+        # 最外层直接返回工具函数的结果，避免再标准化一次
+        return call_operation(tree.body, engine)
+    return normalize(evaluate_expression(tree.body, engine), engine=engine)
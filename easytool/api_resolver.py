@@ -0,0 +1,92 @@
+# — coding: utf-8 –
+"""API名解析：加载时为每个工具预先建立 API名/规范化名 -> tool_guidelines键和api.py函数名 的映射表，
+LLM给出的名字有偏差时用三元组(trigram)相似度做模糊匹配，避免整轮 retrieval 重试。
+调用时在 api.py 中找不到函数才按更高的阈值（FUNCTION_FUZZY_THRESHOLD）替换成最接近的函数，替换会打印并写进调用结果。"""
+import inspect
+from .util import change_name, standardize
+
+FUZZY_THRESHOLD = 0.5
+# 直接替换被调用的函数风险更大：只接受单复数、下划线之类的差别，不接受 get_user_by_id -> get_user_by_name
+FUNCTION_FUZZY_THRESHOLD = 0.75
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def closest_name(name, candidates, threshold=FUZZY_THRESHOLD):
+    """Return the candidate whose trigram set is most similar to name, or None.
+
+    candidates maps each candidate name to its precomputed trigram set.
+    """
+    target = trigrams(standardize(name))
+    best, best_score = None, threshold
+    for candidate, grams in candidates.items():
+        score = similarity(target, grams)
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def closest_function(module, name, threshold=FUNCTION_FUZZY_THRESHOLD):
+    """Fuzzy-match name against the functions actually defined in a loaded api.py module."""
+    functions = {func_name: trigrams(func_name) for func_name, func in inspect.getmembers(module, inspect.isfunction)
+                 if not func_name.startswith("_") and func.__module__ == module.__name__}
+    return closest_name(name, functions, threshold)
+
+
+def substituted_result(result, requested, called):
+    """Wrap a call result so the caller can see that a different function answered it."""
+    if called == requested:
+        return result
+    return {"requested_function": requested, "called_function": called, "result": result}
+
+
+class APIResolver:
+    def __init__(self, dataset):
+        # tool_name -> {别名: tool_guidelines中的API名}
+        self.aliases = {}
+        # tool_name -> {tool_guidelines中的API名: api.py中的函数名}
+        self.functions = {}
+        # tool_name -> {tool_guidelines中的API名: 规范化名的三元组集合}
+        self.grams = {}
+        for tool_instruction in dataset.values():
+            tool_name = tool_instruction["tool_name"]
+            aliases, functions, grams = {}, {}, {}
+            for api_name in tool_instruction["tool_guidelines"].keys():
+                function_name = change_name(standardize(api_name))
+                functions[api_name] = function_name
+                grams[api_name] = trigrams(standardize(api_name))
+                for alias in (api_name, api_name.lower(), standardize(api_name), function_name):
+                    aliases.setdefault(alias, api_name)
+            self.aliases[tool_name] = aliases
+            self.functions[tool_name] = functions
+            self.grams[tool_name] = grams
+
+    def resolve(self, tool_name, api_name):
+        """Map an API name chosen by the LLM to the tool_guidelines key; None if nothing is close."""
+        aliases = self.aliases.get(tool_name)
+        if aliases is None:
+            return None
+        api_name = str(api_name).strip()
+        for alias in (api_name, api_name.lower(), standardize(api_name), change_name(standardize(api_name))):
+            if alias in aliases:
+                return aliases[alias]
+        match = closest_name(api_name, self.grams[tool_name])
+        if match is not None:
+            print(f"Resolved API name {api_name} -> {match}")
+        return match
+
+    def function_name(self, tool_name, api_name):
+        """Function name in api.py for a tool_guidelines key."""
+        functions = self.functions.get(tool_name, {})
+        if api_name in functions:
+            return functions[api_name]
+        return change_name(standardize(api_name))
@@ -0,0 +1,108 @@
+# — coding: utf-8 –
+"""工具调用的执行器：toolbench/toolbench_retrieve 中并发的工具调用（util.parallel_map）都在这里的有界线程池中执行。
+传入的是已经套好 tool_cache、tool_replay、tool_health 和参数校验的调用函数，不直接调用 Call_function。
+
+设置了超时（main.py --tool_call_timeout 或环境变量 TOOL_CALL_TIMEOUT）时，超时的调用按失败处理（返回 -1）。
+还没开始的调用会被取消；已经在线程中运行的调用无法中断，会被记为遗弃的调用，直到它真正结束。
+遗弃的调用占满线程池时，新的调用直接按失败返回，而不是排队等待。"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = int(os.environ.get("TOOL_CALL_WORKERS", 8))
+TIMEOUT = float(os.environ.get("TOOL_CALL_TIMEOUT", 0)) or None
+
+_executor = None
+_lock = threading.Lock()
+# 超时后仍在线程中运行的调用
+_abandoned = set()
+
+
+def configure(timeout=None):
+    """Set the per-call timeout in seconds (None or 0 disables it)."""
+    global TIMEOUT
+    TIMEOUT = timeout or None
+
+
+def get_executor():
+    """Return the dedicated tool executor (TOOL_CALL_WORKERS threads, default 8)."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="tool-call")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def abandoned_calls():
+    """Number of timed out calls that are still running in the executor."""
+    with _lock:
+        return len(_abandoned)
+
+
+def _abandon(future):
+    with _lock:
+        _abandoned.add(future)
+    future.add_done_callback(_release)
+
+
+def _release(future):
+    with _lock:
+        _abandoned.discard(future)
+
+
+async def run_tool(func, *args, timeout=None, deadline=None):
+    """Run a blocking tool function on the tool executor and await its result.
+
+    timeout is in seconds; deadline is an absolute loop.time() value. The tighter of the
+    two wins and asyncio.TimeoutError is raised when it passes. A call that has not started
+    yet is cancelled then; one that is already running is tracked by abandoned_calls() until
+    it finishes, and its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    if deadline is not None:
+        remaining = deadline - loop.time()
+        timeout = remaining if timeout is None else min(timeout, remaining)
+        if timeout <= 0:
+            raise asyncio.TimeoutError
+    if abandoned_calls() >= WORKERS:
+        raise asyncio.TimeoutError
+    future = get_executor().submit(func, *args)
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if not future.cancel():
+            _abandon(future)
+        raise
+
+
+async def call_function_async(func, *args, timeout=None, deadline=None):
+    """Await one tool call; a timed out call counts as failed and returns -1, like Call_function."""
+    try:
+        return await run_tool(func, *args, timeout=timeout, deadline=deadline)
+    except asyncio.TimeoutError:
+        print(f"Tool call timed out ({abandoned_calls()} abandoned calls still running)")
+        return -1
+
+
+async def gather_calls(func, items, timeout=None, deadline=None):
+    """Run func(item) for every item concurrently; results keep the order of items.
+
+    If the surrounding task is cancelled, every pending call is cancelled with it.
+    """
+    return await asyncio.gather(*[call_function_async(func, item, timeout=timeout, deadline=deadline)
+                                  for item in items])
+
+
+def map_calls(func, items, timeout=None):
+    """Blocking form of gather_calls for the synchronous task loops (timeout defaults to TIMEOUT)."""
+    return asyncio.run(gather_calls(func, items, timeout=timeout or TIMEOUT))
@@ -0,0 +1,244 @@
+# — coding: utf-8 –
+"""FuncQA 标准解答的计算链解释器：解析 funcqa_mh/funcqa_oh 中形如 "<multiply>(67,29)=1943" 的计算步骤，
+用 funchub 工具函数（或批量后端）逐步执行，把前面步骤的结果代入后续步骤（"#k" 引用第 k 步的结果），
+并检查每一步给出的数值。
+不调用LLM，可用于校验/生成数据集以及作为基准测试的参考执行器。
+
+用法: python -m easytool.calculation data_funcqa/test_data/funcqa_mh.json [--batch] [--details]
+"""
+import argparse
+import json
+import re
+import time
+from .funchub_batch import call_batch, load_funchub
+
+STEP_PATTERN = re.compile(r'^\s*(-?)\s*<(\w+)>\s*\(([^()]*)\)+\s*(?:=\s*(.*?)\s*)?$')
+# 引用第 k 步（从1开始）结果的写法，如 "<divide>(#1,60)"
+REFERENCE_PATTERN = re.compile(r'^#(\d+)$')
+
+
+def parse_number(text):
+    """int for integer literals, float otherwise (what json.loads would give)."""
+    text = text.strip()
+    if re.fullmatch(r'[+-]?\d+', text):
+        return int(text)
+    return float(text)
+
+
+def parse_step(text):
+    """Split one calculation step into {"text", "op", "args", "stated", "negate"}; raises ValueError."""
+    match = STEP_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Cannot parse calculation step: {text}")
+    negate, op, args, stated = match.groups()
+    return {
+        "text": text,
+        "op": op,
+        "args": [arg.strip() for arg in args.split(",") if arg.strip()],
+        "stated": stated if stated else None,
+        "negate": bool(negate)
+    }
+
+
+def parse_chain(calculation):
+    """A chain is a list of steps (funcqa_mh "calculation") or a single step (funcqa_oh "func")."""
+    if isinstance(calculation, str):
+        calculation = [calculation]
+    return [parse_step(step) for step in calculation]
+
+
+def evaluate_argument(token, steps):
+    """(value, step it comes from or None) for one argument, given the steps executed so far.
+
+    "#k" is replaced by the computed result of step k. A literal equal to the stated result of an
+    earlier step keeps its written value (usually more precise than the normalized result) but is
+    recorded as depending on that step. "a/b" and "a*b" (e.g. "4/3") are evaluated left to right.
+    """
+    reference = REFERENCE_PATTERN.match(token)
+    if reference:
+        index = int(reference.group(1)) - 1
+        if not 0 <= index < len(steps) or steps[index]["result"] is None:
+            raise ValueError(f"Invalid step reference: {token}")
+        return parse_number(steps[index]["result"]), index
+    source = None
+    for index in range(len(steps) - 1, -1, -1):
+        if steps[index]["stated"] == token:
+            source = index
+            break
+    parts = re.split(r'([*/])', token)
+    value = parse_number(parts[0])
+    for operator, operand in zip(parts[1::2], parts[2::2]):
+        value = value * parse_number(operand) if operator == "*" else value / parse_number(operand)
+    return value, source
+
+
+def negate_result(result):
+    if result.startswith("-"):
+        return result[1:]
+    return result if result == "0" else "-" + result
+
+
+def decimals(text):
+    return len(text.split(".")[1]) if "." in text else 0
+
+
+def matches(result, stated):
+    """Whether a computed (normalized) result agrees with the value written in the chain.
+
+    Stated values are often given with more or fewer decimals than normalize() keeps, so they also
+    match after normalizing them the same way, or when the result rounded to their precision is equal.
+    """
+    if stated is None:
+        return True
+    if result is None:
+        return False
+    if result == stated:
+        return True
+    try:
+        if load_funchub().normalize(parse_number(stated), engine="float") == result:
+            return True
+        return round(float(result), decimals(stated)) == float(stated)
+    except ValueError:
+        return False
+
+
+def prepare_step(step, steps):
+    """Fill in the evaluated arguments of a parsed step; returns False if they cannot be evaluated."""
+    step["result"] = None
+    step["error"] = None
+    step["depends_on"] = []
+    try:
+        values = [evaluate_argument(arg, steps) for arg in step["args"]]
+    except (ValueError, ZeroDivisionError) as e:
+        step["error"] = str(e)
+        return False
+    step["values"] = [value for value, _ in values]
+    step["depends_on"] = sorted({source + 1 for _, source in values if source is not None})
+    return True
+
+
+def finish_step(step, result):
+    if result is not None and step["negate"]:
+        result = negate_result(result)
+    step["result"] = result
+    step["ok"] = result is not None and matches(result, step["stated"])
+
+
+def summarize_chain(steps):
+    return {
+        "steps": steps,
+        "result": steps[-1]["result"] if steps else None,
+        "ok": bool(steps) and all(step["ok"] for step in steps)
+    }
+
+
+def failed_chain(error):
+    return {"steps": [], "result": None, "ok": False, "error": error}
+
+
+def run_chain(calculation):
+    """Execute one chain step by step with the scalar funchub functions."""
+    try:
+        pending = parse_chain(calculation)
+    except ValueError as e:
+        return failed_chain(str(e))
+    funchub = load_funchub()
+    steps = []
+    for step in pending:
+        if prepare_step(step, steps):
+            function = getattr(funchub, step["op"] + "_", None)
+            if function is None:
+                step["error"] = f"No function named {step['op']}_"
+                finish_step(step, None)
+            else:
+                try:
+                    finish_step(step, function(step["values"], engine="float"))
+                except Exception as e:
+                    step["error"] = f"{type(e).__name__}: {e}"
+                    finish_step(step, None)
+        else:
+            finish_step(step, None)
+        steps.append(step)
+    return summarize_chain(steps)
+
+
+def run_chains(calculations, batch=False):
+    """Execute many chains; with batch=True the k-th steps of all chains are evaluated together
+    through funchub_batch, grouped by operation. Both give identical results."""
+    if not batch:
+        return [run_chain(calculation) for calculation in calculations]
+    chains = []
+    for calculation in calculations:
+        try:
+            chains.append({"pending": parse_chain(calculation), "steps": []})
+        except ValueError as e:
+            chains.append({"pending": [], "steps": [], "error": str(e)})
+    for k in range(max((len(chain["pending"]) for chain in chains), default=0)):
+        groups = {}
+        for chain in chains:
+            if k >= len(chain["pending"]):
+                continue
+            step = chain["pending"][k]
+            if prepare_step(step, chain["steps"]):
+                groups.setdefault(step["op"] + "_", []).append(step)
+            else:
+                finish_step(step, None)
+            chain["steps"].append(step)
+        for name, steps in groups.items():
+            try:
+                results = call_batch(name, [step["values"] for step in steps])
+            except KeyError as e:
+                results = [None] * len(steps)
+                for step in steps:
+                    step["error"] = str(e)
+            for step, result in zip(steps, results):
+                if result is None and step["error"] is None:
+                    step["error"] = f"{name} failed"
+                finish_step(step, result)
+    results = []
+    for chain in chains:
+        if "error" in chain:
+            results.append(failed_chain(chain["error"]))
+        else:
+            results.append(summarize_chain(chain["steps"]))
+    return results
+
+
+def load_dataset(path):
+    """[(question, chain, answer)] from funcqa_mh.json ("calculation") or funcqa_oh.json ("func")."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [(item["question"], item.get("calculation", item.get("func")), item.get("answer")) for item in data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execute and check the calculation chains of a FuncQA dataset")
+    parser.add_argument('path', nargs='?', default='data_funcqa/test_data/funcqa_mh.json')
+    parser.add_argument('--batch', action='store_true', help="evaluate all chains with funchub_batch")
+    parser.add_argument('--details', action='store_true', help="print every failing step")
+    args = parser.parse_args()
+    dataset = load_dataset(args.path)
+    start = time.time()
+    results = run_chains([chain for _, chain, _ in dataset], batch=args.batch)
+    elapsed = time.time() - start
+    failed_steps = 0
+    answer_ok = 0
+    for (question, _, answer), result in zip(dataset, results):
+        answer_ok += matches(result["result"], None if answer is None else str(answer))
+        bad = [step for step in result["steps"] if not step["ok"]]
+        failed_steps += len(bad)
+        if args.details and (bad or "error" in result):
+            print(f"- {question}")
+            for step in bad:
+                print(f"    {step['text']} -> {step['result']} {step['error'] or ''}")
+            if "error" in result:
+                print(f"    {result['error']}")
+    total_steps = sum(len(result["steps"]) for result in results)
+    print(f"chains: {len(results)}, consistent: {sum(result['ok'] for result in results)}, "
+          f"final result matches answer: {answer_ok}")
+    print(f"steps: {total_steps}, failed: {failed_steps}")
+    print(f"time: {elapsed:.3f}s ({len(results) / max(elapsed, 1e-9):.0f} chains/s)")
+
+
+if __name__ == '__main__':
+    main()
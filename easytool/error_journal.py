@@ -0,0 +1,218 @@
+# — coding: utf-8 –
+"""工具调用错误日志：失败记录先进入内存队列，由后台线程批量写入 wrong_log.json（格式与原来一样，每行一条失败记录）。
+每次调用和每次失败同时按 (工具, API) 计数，累加到单独的统计文件（默认 wrong_log_stats.json），
+失败率 = 失败次数 / 调用次数，两者都来自同一批调用事件。
+
+用法: python -m easytool.error_journal [wrong_log.json] [--stats wrong_log_stats.json] [--top 20]
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from .tool_cache import IGNORED_KEYS, canonical_arguments
+
+FLUSH_SIZE = 64
+FLUSH_INTERVAL = 2.0
+
+
+def stats_path_for(path):
+    """Default stats file next to the error log: wrong_log.json -> wrong_log_stats.json."""
+    root, ext = os.path.splitext(path)
+    return root + '_stats' + (ext or '.json')
+
+
+def parameters_hash(arg):
+    payload = json.dumps(canonical_arguments(arg), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ErrorJournal:
+    def __init__(self, path='wrong_log.json', stats_path=None, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.stats_path = stats_path or stats_path_for(path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.calls = Counter()
+        self.failures = Counter()
+        self.calls_lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="error-journal", daemon=True)
+        self.thread.start()
+
+    def count_call(self, tool, api):
+        with self.calls_lock:
+            self.calls[(tool, api)] += 1
+
+    def log_error(self, id, tool, api, arg, error, latency=None):
+        """Journal a failed call; the call itself must already have been counted with count_call."""
+        with self.calls_lock:
+            self.failures[(tool, api)] += 1
+        parameters = {k: v for k, v in arg.items() if k not in IGNORED_KEYS} if isinstance(arg, dict) else arg
+        self.queue.put({
+            "id": id,
+            "status": "error",
+            "tool": tool,
+            "api": api,
+            "exception": type(error).__name__ if isinstance(error, BaseException) else "Error",
+            "wrong": str(error),
+            "parameters": parameters,
+            "parameters_hash": parameters_hash(parameters) if isinstance(parameters, dict) else "",
+            "latency": latency,
+            "time": time.time()
+        })
+
+    def reject(self, id, tool, api, arg, error):
+        """Count and journal a call that was refused before reaching the tool (e.g. invalid parameters)."""
+        self.count_call(tool, api)
+        self.log_error(id, tool, api, arg, error)
+
+    def drain_counts(self):
+        """Take the call and failure counters accumulated since the last flush."""
+        with self.calls_lock:
+            calls, self.calls = self.calls, Counter()
+            failures, self.failures = self.failures, Counter()
+        return calls, failures
+
+    def write(self, records):
+        if not records:
+            return
+        with open(self.path, 'a+', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def write_stats(self, calls, failures):
+        """Add the counters to the stats file ({tool: {api: {"calls": n, "failures": m}}})."""
+        if not calls and not failures:
+            return
+        stats = load_stats(self.stats_path)
+        for (tool, api) in set(calls) | set(failures):
+            entry = stats.setdefault(tool, {}).setdefault(api, {"calls": 0, "failures": 0})
+            entry["calls"] += calls[(tool, api)]
+            entry["failures"] += failures[(tool, api)]
+        try:
+            tmp_path = self.stats_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"Failed to save tool call stats to {self.stats_path}: {e}")
+
+    def run(self):
+        buffer = []
+        last_flush = time.time()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+            if record is not None:
+                buffer.append(record)
+            stop = self.closed and self.queue.empty()
+            if stop or len(buffer) >= self.flush_size or time.time() - last_flush >= self.flush_interval:
+                counts = self.drain_counts()
+                self.write(buffer)
+                self.write_stats(*counts)
+                buffer = []
+                last_flush = time.time()
+            if stop:
+                return
+
+    def close(self):
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+
+_journal = None
+_lock = threading.Lock()
+
+
+def get_journal():
+    global _journal
+    if _journal is None:
+        with _lock:
+            if _journal is None:
+                _journal = ErrorJournal(os.environ.get("WRONG_LOG_FILE", 'wrong_log.json'),
+                                        os.environ.get("WRONG_LOG_STATS_FILE"))
+                atexit.register(_journal.close)
+    return _journal
+
+
+def count_call(tool, api):
+    get_journal().count_call(tool, api)
+
+
+def log_error(id, tool, api, arg, error, latency=None):
+    get_journal().log_error(id, tool, api, arg, error, latency)
+
+
+def reject(id, tool, api, arg, error):
+    get_journal().reject(id, tool, api, arg, error)
+
+
+def load_stats(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def summarize(path, stats_path=None):
+    """Per-tool calls, failures, failure rate and most common exception classes.
+
+    Calls and failures come from the stats file; wrong_log.json only supplies the exception
+    classes. Without a stats file the call count is unknown and calls/failure_rate are None.
+    """
+    exceptions = defaultdict(Counter)
+    logged = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "wrong" not in record:
+                continue
+            tool = record.get("tool", "unknown")
+            logged[tool] += 1
+            exceptions[tool][record.get("exception", "Error")] += 1
+    stats = load_stats(stats_path or stats_path_for(path))
+    rows = []
+    for tool in set(logged) | set(stats):
+        apis = stats.get(tool, {}).values()
+        calls = sum(entry["calls"] for entry in apis) if tool in stats else None
+        failures = sum(entry["failures"] for entry in apis) if tool in stats else logged[tool]
+        rows.append({
+            "tool": tool,
+            "calls": calls,
+            "failures": failures,
+            "failure_rate": failures / calls if calls else None,
+            "exceptions": dict(exceptions[tool].most_common(3))
+        })
+    rows.sort(key=lambda row: (row["failures"], row["failure_rate"] or 0.0), reverse=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize tool call failures in wrong_log.json")
+    parser.add_argument('path', nargs='?', default='wrong_log.json')
+    parser.add_argument('--stats', default=None, help='stats file (default: <path>_stats.json)')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    rows = summarize(args.path, args.stats)
+    print(f"{'tool':<40} {'calls':>7} {'fails':>7} {'rate':>7}  exceptions")
+    for row in rows[:args.top]:
+        calls = '-' if row['calls'] is None else row['calls']
+        rate = '-' if row['failure_rate'] is None else f"{row['failure_rate']:.1%}"
+        print(f"{row['tool'][:40]:<40} {calls:>7} {row['failures']:>7} {rate:>7}  {row['exceptions']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,26 +20,19 @@ import re
 import importlib.util
 from sklearn.metrics.pairwise import cosine_similarity
 import pickle
+import time
 from .util import *
+from .param_validation import get_validator, reject, rejected_parameters
+from .parameter_extraction import extract_parameters
+from .funchub_batch import load_funchub
+from .stage_planner import StagePlan, question_shape
+from .run_journal import preview
+from . import error_journal
 from tqdm import tqdm
 
 openai.api_key = os.environ["OPENAI_API_KEY"]
-
-
-def get_last_processed_index(progress_file):
-    """Retrieve the last processed index from the progress file."""
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            last_index = f.read().strip()
-            return int(last_index) if last_index else 0
-    else:
-        return 0
-
-
-def update_progress(progress_file, index):
-    """Update the last processed index in the progress file."""
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        f.write(str(index))
+# 先用规则从子任务文本中抽取参数，不确定时才调用LLM（设为0则总是调用LLM）
+RULE_PARAMETERS = os.environ.get("FUNCQA_RULE_PARAMETERS", "1") != "0"
 
 
 # 在文件顶部添加导入
@@ -307,6 +300,8 @@ def choose_parameter_depend(API_instruction, api, api_dic, question, model_name,
 
 
 def Call_function(B, arg, id):
+    start = time.time()
+    error_journal.count_call("funchub", B)
     app_path = 'data_funcqa/funchub/math.py'
     spec = importlib.util.spec_from_file_location('math', app_path)
     app_module = importlib.util.module_from_spec(spec)
@@ -329,36 +324,30 @@ def Call_function(B, arg, id):
                     return call_result
                 except Exception as e:
                     print(f"fails: {e}")
-                    with open('wrong_log.json', 'a+', encoding='utf-8') as f:
-                        line = json.dumps({
-                            "id": id,
-                            "parameters": arg,
-                            "wrong": str(e)
-                        }, ensure_ascii=False)
-                        f.write(line + '\n')
+                    error_journal.log_error(id, "funchub", B, arg, e, time.time() - start)
                     return -1
     else:
-        with open('wrong_log.json', 'a+', encoding='utf-8') as f:
-            line = json.dumps({
-                "id": id,
-                "parameters": arg,
-                "wrong": f"No function named {B} in {app_path}"
-            }, ensure_ascii=False)
-            f.write(line + '\n')
+        error_journal.log_error(id, "funchub", B, arg, AttributeError(f"No function named {B} in {app_path}"),
+                                time.time() - start)
         return (f"No function named {B} in {app_path}")
 
 
-def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, previous_log=None):
+def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, previous_log=None, previous_results=None):
     tool_id = choose_tool(question, Tool_dic, tool_used, model_name)
     if tool_id == -1:
         return tool_id, "", "", "", ""
     tool_instruction = dataset[str(tool_id["ID"])]
     API_instruction = tool_instruction["API_description"]
-    API_tool = tool_instruction["tool_name"]
+    API_tool = tool_instruction["standardized_name"]
 
     api_selection = [API_tool]
     api_result = []
     for api in api_selection:
+        parameter = extract_parameters(question, API_tool, previous_log, previous_results) if RULE_PARAMETERS else None
+        if parameter is not None:
+            print(f"Rule-based parameters for {API_tool}: {parameter}")
+            api_result.append({"api_name": api, "parameters": parameter, "source": "rule"})
+            continue
         if previous_log is None:
             parameter = choose_parameter(API_instruction, api,
                                          tool_instruction["Usage"], question, model_name)
@@ -373,6 +362,7 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, previous_
         call_result = ""
         return tool_id, api_result, call_result, tool_instruction, API_instruction
     if isinstance(api_result, set) or isinstance(api_result, list):
+        validator = get_validator(API_tool, API_tool, tool_instruction["Usage"])
         call_results = []
         for api in api_result:
             if isinstance(api["parameters"], dict):
@@ -381,6 +371,13 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, previous_
                     value = api["parameters"][key]
                     key = change_name(key)
                     parameters[key] = value
+                parameters, errors = validator.validate(parameters)
+                if errors:
+                    print(f"Invalid parameters for {API_tool}: {errors}")
+                    reject(api, parameters, errors)
+                    error_journal.reject(ind, "funchub", API_tool, parameters,
+                                         ValueError(f"Invalid parameters for {API_tool}: {errors}"))
+                    continue
                 call_result = Call_function(API_tool, parameters, ind)
                 if call_result == -1:
                     continue
@@ -392,6 +389,13 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, previous_
                         value = para_ls[key]
                         key = change_name(key)
                         parameters[key] = value
+                    parameters, errors = validator.validate(parameters)
+                    if errors:
+                        print(f"Invalid parameters for {API_tool}: {errors}")
+                        reject(api, parameters, errors)
+                        error_journal.reject(ind, "funchub", API_tool, parameters,
+                                             ValueError(f"Invalid parameters for {API_tool}: {errors}"))
+                        continue
                     call_result = Call_function(API_tool, parameters, ind)
                     if call_result == -1:
                         continue
@@ -507,6 +511,34 @@ def answer_generation_depend(question, API_instruction, call_result, previous_lo
     return result
 
 
+def recompute(API_tool, arg):
+    """Result of the funchub call recomputed with the other engine (decimal if the calls use float)."""
+    funchub = load_funchub()
+    engine = "float" if funchub.ENGINE == "decimal" else "decimal"
+    return getattr(funchub, API_tool)(arg, engine=engine)
+
+
+def answer_template(api_result, call_result):
+    """Subtask answer built from a single funchub call with a numeric result, verified locally by
+    recomputing it; None when the answer has to be generated by the LLM."""
+    if len(api_result) != 1 or not isinstance(api_result[0]["parameters"], dict):
+        return None
+    API_tool = api_result[0]["api_name"]
+    arg = [v for k, v in api_result[0]["parameters"].items() if change_name(k.lower()) == "input"]
+    call_result = str(call_result).strip()
+    if len(arg) != 1 or not re.fullmatch(r'-?\d+(\.\d+)?', call_result):
+        return None
+    try:
+        if recompute(API_tool, arg[0]) != call_result:
+            print(f"Local verification fails: {API_tool}({arg[0]}) != {call_result}")
+            return None
+    except Exception as e:
+        print(f"Local verification fails: {e}")
+        return None
+    arguments = arg[0] if isinstance(arg[0], str) else ", ".join(str(v) for v in arg[0])
+    return f"{API_tool.rstrip('_')}({arguments}) = {call_result}. The answer is {call_result}."
+
+
 def answer_summarize(question, answer_task, model_name):
     """总结所有任务的答案"""
     chat = ChatOpenAI(
@@ -557,19 +589,26 @@ def answer_check(question, answer, model_name):
 
 def task_execution_mh(data_type, start_index, total_files,
                       retrieval_num, ind, model_name, dataset,
-                      Tool_dic, test_data, progress_file):
-    """执行多跳任务"""
+                      Tool_dic, test_data, journal, template_answers=False):
+    """执行多跳任务
+
+    template_answers=True 时，funchub 返回数值结果的子任务直接用模板生成答案并在本地重新计算校验，
+    只有一个子任务且它这样完成时不再调用 answer_summarize；answer_check 总是照常调用。
+    """
     with tqdm(total=total_files, desc="Processing files", initial=start_index) as pbar:
-        for i, data in enumerate(test_data[start_index:], start=start_index):
+        for i in journal.pending():
+            data = test_data[i]
             answer_ls = []
             question = data["question"]
             print(question)
             
+            plan = StagePlan(question, model_name)
             # 添加错误检查
             temp_result = task_decompose(question, Tool_dic, model_name)
             if temp_result == -1:
                 print(f"任务分解失败，跳过问题: {question}")
-                update_progress(progress_file, i + 1)
+                # 提交一条跳过记录，续跑时不再无休止地重试
+                journal.commit(i, {"ID": i + 1, "question": question, "skipped": "task_decompose"})
                 pbar.update(1)
                 continue
             
@@ -579,10 +618,10 @@ def task_execution_mh(data_type, start_index, total_files,
                 task_ls.append({"task": temp[t], "id": t + 1})
             
             # 添加错误检查
-            task_ls_result = task_topology(question, task_ls, model_name)
+            task_ls_result = plan.topology(task_ls, task_topology)
             if task_ls_result == -1:
                 print(f"任务拓扑分析失败，跳过问题: {question}")
-                update_progress(progress_file, i + 1)
+                journal.commit(i, {"ID": i + 1, "question": question, "skipped": "task_topology"})
                 pbar.update(1)
                 continue
             
@@ -590,11 +629,14 @@ def task_execution_mh(data_type, start_index, total_files,
             task_depend = {'Original Question': question}
             for task_dic in task_ls:
                 task_depend[task_dic['id']] = {'task': task_dic['task'], 'answer': ''}
+            task_results = {}
+            templated_ls = []
             answer_task = []
             tool_instruction_ls = []
             api_result_ls = []
             call_result_ls = []
             tool_check_reason_ls = []
+            rejected_ls = []
             for task_dic in task_ls:
                 task = task_dic['task']
                 print("Do need tool.")
@@ -608,18 +650,27 @@ def task_execution_mh(data_type, start_index, total_files,
                                                                                                         model_name)
                         if len(str(call_result)) > 5000:
                             call_result = str(call_result)[:5000]
-                        answer = answer_generation(task, API_instruction, call_result, model_name)
+                        answer = answer_template(api_result, call_result) if template_answers else None
+                        templated = answer is not None
+                        if not templated:
+                            answer = answer_generation(task, API_instruction, call_result, model_name)
                     else:
                         previous_log = task_depend
                         tool_id, api_result, call_result, tool_instruction, API_instruction = retrieval(task, Tool_dic,
                                                                                                         dataset,
                                                                                                         tool_used, ind,
                                                                                                         model_name,
-                                                                                                        previous_log=previous_log)
+                                                                                                        previous_log=previous_log,
+                                                                                                        previous_results=task_results)
                         if len(str(call_result)) > 5000:
                             call_result = str(call_result)[:5000]
-                        answer = answer_generation_depend(task, API_instruction, call_result, previous_log, model_name)
+                        answer = answer_template(api_result, call_result) if template_answers else None
+                        templated = answer is not None
+                        if not templated:
+                            answer = answer_generation_depend(task, API_instruction, call_result, previous_log,
+                                                              model_name)
 
+                    rejected_ls.extend(rejected_parameters(api_result))
                     check_index = 1
                     if str(call_result).strip() == '-1' or str(call_result).strip() == '':
                         check_index = -1
@@ -628,6 +679,8 @@ def task_execution_mh(data_type, start_index, total_files,
                         tool_instruction_ls.append(tool_instruction)
                         api_result_ls.append(api_result)
                         call_result_ls.append(call_result)
+                        task_results[task_dic['id']] = call_result
+                        templated_ls.append(templated)
                         break
                     else:
                         answer_ls.append({'task': task, 'answer': answer})
@@ -638,47 +691,53 @@ def task_execution_mh(data_type, start_index, total_files,
                         print('****Try Again****')
 
                 task_depend[task_dic['id']]['answer'] = answer
-            final_answer = answer_summarize(question, answer_task, model_name)
-            check_index = answer_check(question, final_answer, model_name)
-            ind = ind + 1
-            with open(f"FuncQA_{data_type}_{model_name}_easytool.jsonl", 'a+', encoding='utf-8') as f:
-                line = json.dumps({
-                    "ID": ind,
-                    "question": question,
-                    "final_answer": final_answer,
-                    "subtask": task_ls,
-                    "answer_subtask": answer_task,
-                    "answer_wrong": answer_ls,
-                    "check_index": check_index,
-                    "execute_log": {
-                        "api_result_ls": api_result_ls,
-                        "call_result_ls": call_result_ls,
-                        "tool_check_reason_ls": tool_check_reason_ls,
-                        "tool_instruction_ls": tool_instruction_ls,
-                    },
-                    "check": 0
-                }, ensure_ascii=False)
-                f.write(line + '\n')
-
-            print(final_answer)
-            update_progress(progress_file, i + 1)
+            verified = bool(templated_ls) and len(templated_ls) == len(task_ls) and all(templated_ls)
+            final_answer = plan.summarize(answer_task, task_ls, answer_summarize, verified)
+            check_index = plan.check(final_answer, answer_check)
+            ind = i + 1
+            journal.commit(i, {
+                "ID": ind,
+                "question": question,
+                "final_answer": final_answer,
+                "subtask": task_ls,
+                "answer_subtask": answer_task,
+                "answer_wrong": answer_ls,
+                "check_index": check_index,
+                "verified_locally": verified,
+                "question_shape": question_shape(task_ls),
+                "skipped_stages": plan.skipped,
+                "execute_log": {
+                    "api_result_ls": api_result_ls,
+                    "call_result_ls": call_result_ls,
+                    "tool_check_reason_ls": tool_check_reason_ls,
+                    "rejected_parameters": rejected_ls,
+                    "tool_instruction_ls": tool_instruction_ls,
+                },
+                "check": 0
+            })
+
+            print(preview(final_answer))
             pbar.update(1)
 
 
 def task_execution_oh(data_type, start_index, total_files,
                       retrieval_num, ind, model_name, dataset,
-                      Tool_dic, test_data, progress_file):
+                      Tool_dic, test_data, journal, template_answers=False):
     with tqdm(total=total_files, desc="Processing files", initial=start_index) as pbar:
-        for i, data in enumerate(test_data[start_index:], start=start_index):
+        for i in journal.pending():
+            data = test_data[i]
             answer_ls = []
             question = data["question"]
             print(question)
             task_ls = [{"task": question}]
+            plan = StagePlan(question, model_name)
+            templated_ls = []
             answer_task = []
             tool_instruction_ls = []
             api_result_ls = []
             call_result_ls = []
             tool_check_reason_ls = []
+            rejected_ls = []
             for task_dic in task_ls:
                 task = task_dic['task']
                 print("Do need tool.")
@@ -691,8 +750,12 @@ def task_execution_oh(data_type, start_index, total_files,
                                                                                                     model_name)
                     if len(str(call_result)) > 5000:
                         call_result = str(call_result)[:5000]
-                    answer = answer_generation(task, API_instruction, call_result, model_name)
+                    answer = answer_template(api_result, call_result) if template_answers else None
+                    templated = answer is not None
+                    if not templated:
+                        answer = answer_generation(task, API_instruction, call_result, model_name)
 
+                    rejected_ls.extend(rejected_parameters(api_result))
                     check_index = 1
                     if str(call_result).strip() == '-1' or str(call_result).strip() == '':
                         check_index = -1
@@ -701,6 +764,7 @@ def task_execution_oh(data_type, start_index, total_files,
                         tool_instruction_ls.append(tool_instruction)
                         api_result_ls.append(api_result)
                         call_result_ls.append(call_result)
+                        templated_ls.append(templated)
                         break
                     else:
                         answer_ls.append({'task': task, 'answer': answer})
@@ -710,29 +774,31 @@ def task_execution_oh(data_type, start_index, total_files,
                             continue
                         print('****Try Again****')
 
-            final_answer = answer_summarize(question, answer_task, model_name)
-            check_index = answer_check(question, final_answer, model_name)
-            ind = ind + 1
-            with open(f"FuncQA_{data_type}_{model_name}_easytool.jsonl", 'a+', encoding='utf-8') as f:
-                line = json.dumps({
-                    "ID": ind,
-                    "question": question,
-                    "final_answer": final_answer,
-                    "subtask": task_ls,
-                    "answer_subtask": answer_task,
-                    "answer_wrong": answer_ls,
-                    "check_index": check_index,
-                    "execute_log": {
-                        "api_result_ls": api_result_ls,
-                        "call_result_ls": call_result_ls,
-                        "tool_check_reason_ls": tool_check_reason_ls,
-                        "tool_instruction_ls": tool_instruction_ls,
-                    },
-                    "check": 0
-                }, ensure_ascii=False)
-                f.write(line + '\n')
-
-            print(final_answer)
-            update_progress(progress_file, i + 1)
+            verified = bool(templated_ls) and all(templated_ls)
+            final_answer = plan.summarize(answer_task, task_ls, answer_summarize, verified)
+            check_index = plan.check(final_answer, answer_check)
+            ind = i + 1
+            journal.commit(i, {
+                "ID": ind,
+                "question": question,
+                "final_answer": final_answer,
+                "subtask": task_ls,
+                "answer_subtask": answer_task,
+                "answer_wrong": answer_ls,
+                "check_index": check_index,
+                "verified_locally": verified,
+                "question_shape": question_shape(task_ls),
+                "skipped_stages": plan.skipped,
+                "execute_log": {
+                    "api_result_ls": api_result_ls,
+                    "call_result_ls": call_result_ls,
+                    "tool_check_reason_ls": tool_check_reason_ls,
+                    "rejected_parameters": rejected_ls,
+                    "tool_instruction_ls": tool_instruction_ls,
+                },
+                "check": 0
+            })
+
+            print(preview(final_answer))
             pbar.update(1)
 
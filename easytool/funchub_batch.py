@@ -0,0 +1,428 @@
+# — coding: utf-8 –
+"""funchub 数学工具的批量版本：一次计算多组参数，返回与 data_funcqa/funchub/math.py 中
+标量函数逐个调用完全相同的规范化结果。
+
+输入可以是参数列表的列表（长度可以不同），也可以是补齐后的矩阵加每行的长度。
+能够证明与标量函数结果一致的行用 NumPy 向量化计算；结果落在舍入边界附近、超出 float64
+精确范围或会抛出异常的行回退到标量函数逐个计算。标量函数抛出异常的行结果为 None。
+全部是整数参数的整数运算批次直接用 Python 整数计算，不经过 float64。
+"""
+import importlib.util
+import math
+import os
+from itertools import chain, starmap
+import numpy as np
+
+FUNCHUB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'data_funcqa', 'funchub', 'math.py')
+# float64 能精确表示的整数范围
+EXACT_INT = 2 ** 53
+POWERS_OF_TEN = 10.0 ** np.arange(11)
+EPS = np.finfo(np.float64).eps
+# NumPy 的 power/log 与 libm 的结果可能相差几个 ulp
+LIBM_ERROR = 1e-12
+# sum() 在 Python 3.12 之后对浮点数做补偿求和，三项以上时与逐项相加的结果可能不同
+COMPENSATED_SUM = sum([0.1, 0.2, 0.3]) != 0.1 + 0.2 + 0.3
+
+_funchub = None
+
+
+def load_funchub():
+    """Load funchub/math.py once (by path, it would shadow the stdlib math module as a package)."""
+    global _funchub
+    if _funchub is None:
+        spec = importlib.util.spec_from_file_location('math', FUNCHUB_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _funchub = module
+    return _funchub
+
+
+def exact_argument(value):
+    """Whether a scalar argument is a float, or an int that float64 represents exactly."""
+    return type(value) is float or (type(value) is int and -EXACT_INT < value < EXACT_INT)
+
+
+class Batch:
+    """Argument lists as a zero padded float64 matrix plus per-row bookkeeping."""
+
+    def __init__(self, batch, lengths=None):
+        if lengths is None:
+            self.from_ragged(batch)
+        else:
+            self.from_padded(batch, lengths)
+        self.columns = self.values.shape[1]
+        # 没有参数的行交给标量函数处理（add_ 返回 "0"，其余抛出异常）
+        self.fallback |= self.lengths == 0
+        # Python 整数运算是精确的，超出 float64 精确范围的参数交给标量函数（整数参数在转换前已检查，
+        # 这里处理浮点参数）
+        active = np.arange(self.columns) < self.lengths[:, None]
+        self.fallback |= ((np.abs(self.values) >= EXACT_INT) & active).any(axis=1)
+        self._ints = None
+
+    def from_ragged(self, batch):
+        self.rows = batch
+        n = len(batch)
+        self.lengths = np.fromiter(map(len, batch), dtype=np.int64, count=n)
+        self.values = np.zeros((n, int(self.lengths.max(initial=0))))
+        self.fallback = np.zeros(n, dtype=bool)
+        flat = list(chain.from_iterable(batch))
+        # 整数是否能被 float64 精确表示必须在转换之前判断：2**53 + 1 转换后就变成了 2**53
+        if not set(map(type, flat)) <= {int, float} or \
+                (flat and not -EXACT_INT < min(flat) <= max(flat) < EXACT_INT):
+            # 含有非数字参数（包括 bool）或超大整数的行由标量函数决定结果
+            for i, row in enumerate(batch):
+                if not all(map(exact_argument, row)):
+                    self.fallback[i] = True
+            flat = [v if exact_argument(v) else 0 for v in flat]
+        flat = np.array(flat, dtype=np.float64)
+        rows = np.repeat(np.arange(n), self.lengths)
+        offsets = np.cumsum(self.lengths) - self.lengths
+        self.values[rows, np.arange(len(flat)) - np.repeat(offsets, self.lengths)] = flat
+
+    def from_padded(self, matrix, lengths):
+        matrix = np.asarray(matrix)
+        if matrix.ndim != 2:
+            raise ValueError("padded batch must be a 2-d matrix")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        if self.lengths.shape != (matrix.shape[0],) or (self.lengths > matrix.shape[1]).any() \
+                or (self.lengths < 0).any():
+            raise ValueError("lengths must give one valid row length per matrix row")
+        self.matrix = matrix
+        self.rows = None
+        active = np.arange(matrix.shape[1]) < self.lengths[:, None]
+        if matrix.dtype.kind in "iu":
+            inexact = (matrix >= EXACT_INT) | (matrix <= -EXACT_INT)
+        elif matrix.dtype.kind == "O":
+            # Python 整数、Decimal 等对象在转换成 float64 之前检查
+            inexact = ~np.vectorize(exact_argument, otypes=[bool])(matrix)
+        else:
+            inexact = np.zeros(matrix.shape, dtype=bool)
+        self.fallback = (inexact & active).any(axis=1)
+        self.values = np.where(inexact, 0, matrix).astype(np.float64)
+
+    @property
+    def ints(self):
+        """Rows whose arguments are all Python ints (integer dtype for a padded matrix)."""
+        if self._ints is None:
+            if self.rows is None:
+                self._ints = np.full(len(self.lengths), self.matrix.dtype.kind in "iu")
+            else:
+                self._ints = np.fromiter((all(type(v) is int for v in row) for row in self.rows),
+                                         dtype=bool, count=len(self.rows))
+        return self._ints
+
+    def row(self, i):
+        """Argument list of row i as the scalar function would receive it."""
+        if self.rows is not None:
+            return list(self.rows[i])
+        return self.matrix[i, :self.lengths[i]].tolist()
+
+    def active(self, j):
+        return j < self.lengths
+
+    def column(self, j):
+        return self.values[:, j] if j < self.columns else np.zeros(len(self.lengths))
+
+
+def fold(batch, op, invalid=None):
+    """Left fold op over each row like the scalar loops; invalid(acc, arg) flags rows to fall back."""
+    acc = batch.column(0).copy()
+    for j in range(1, batch.columns):
+        active = batch.active(j)
+        arg = batch.values[:, j]
+        if invalid is not None:
+            batch.fallback |= active & invalid(acc, arg)
+        acc = np.where(active, op(acc, arg), acc)
+        # 中间结果达到 float64 精确整数范围的边界时，整数行在 Python 中的结果可能不同
+        batch.fallback |= np.abs(acc) >= EXACT_INT
+    return acc
+
+
+def near_tie(scaled, error):
+    """Whether rounding scaled to an integer could go either way given its relative error."""
+    return np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= (2 * EPS + error) * np.abs(scaled)
+
+
+def decimal_places(x, error):
+    """custom_round's number of decimals for each x, plus rows where it cannot be decided safely.
+
+    custom_round keeps two significant decimals after the leading zeros of f"{x:.10f}" when the integer
+    part is "0" (so never for negative numbers, whose integer part is "-0"), and two decimals otherwise.
+    """
+    units = x * 1e10
+    small = ~np.signbit(x) & (units < 1e10 - 0.5)
+    # 靠近 .10f 舍入边界时前导零的个数可能与标量函数不同
+    unsafe = small & near_tie(units, error)
+    digits = np.searchsorted(POWERS_OF_TEN, np.where(small, np.rint(units), 0), side='right')
+    zeros = 10 - digits
+    return np.where(small & (zeros >= 1), zeros + 2, 2), unsafe
+
+
+def normalize_batch(x, fallback, error=0.0):
+    """normalize() for every element of x; returns (strings, rows that still need the scalar path).
+
+    error bounds the relative difference between x and the value the scalar function computes: 0 for
+    IEEE arithmetic done in the same order, a few ulps for libm functions whose NumPy versions may differ.
+    Results that close to a rounding tie are left to the scalar path.
+    """
+    # 结果为 0 时符号取决于参数是整数还是浮点数（0 与 -0.0），交给标量函数
+    fast = ~fallback & np.isfinite(x) & (x != 0)
+    x = np.where(fast, x, 0.0)
+    places, unsafe = decimal_places(x, error)
+    scale = 10.0 ** places
+    scaled = x * scale
+    integral = np.abs(x) >= 2 ** 52
+    # 超过 2**52 的数本身就是整数，但只有结果与标量函数逐位相同时才能直接使用
+    fast &= ~unsafe & ((integral & (error == 0)) | (~integral & ~near_tie(scaled, error)))
+    units = np.where(integral, 0, np.rint(scaled))[fast]
+    rounded = np.where(integral, x, np.rint(scaled) / scale)[fast]
+    # 舍入为零的负数输出 "0"，与 normalize 一致
+    places, negative = places[fast], np.signbit(rounded) & (rounded != 0)
+    out = np.empty(len(x), dtype=object)
+    index = np.flatnonzero(fast)
+    # 有效数字不超过 15 位的定点数，repr 就是 units / 10**places 的十进制写法，可以直接用整数拼出来
+    direct = ~integral[fast] & (np.abs(units) < 1e15) & (np.abs(rounded) >= 1e-4)
+    out[index[direct]] = format_decimal(units[direct], places[direct], negative[direct])
+    # 其余的数（Python 可能使用科学计数法）逐个按 normalize 的方式格式化
+    for i, value in zip(index[~direct], rounded[~direct].tolist()):
+        out[i] = format_rounded(value)
+    return out, ~fast
+
+
+def format_decimal(units, places, negative):
+    """Decimal strings of units / 10**places with trailing zeros (and a bare ".") removed."""
+    units = np.abs(units).astype(np.int64)
+    places = places.astype(np.int64)
+    trailing = (places > 0) & (units % 10 == 0)
+    while trailing.any():
+        units = np.where(trailing, units // 10, units)
+        places = places - trailing
+        trailing = (places > 0) & (units % 10 == 0)
+    unit = 10 ** places
+    # 整数部分和小数部分已经算好，逐个用 % 拼接比 np.char 的字符串运算快得多
+    return ["%s%d.%0*d" % (sign, whole, width, fraction) if width else "%s%d" % (sign, whole)
+            for sign, whole, fraction, width in zip(np.where(negative, "-", "").tolist(), (units // unit).tolist(),
+                                                    (units % unit).tolist(), places.tolist())]
+
+
+def format_rounded(value):
+    """The string half of normalize() for a value custom_round has already rounded."""
+    res = str(abs(value) if value == 0 else value)
+    if "." in res:
+        res = res.rstrip("0").strip(".")
+    if "e" in res:
+        res = load_funchub().scito_decimal(res)
+    return res
+
+
+def finish(batch, name, out, pending):
+    """Fill the rows the vectorized path could not decide with the scalar funchub function."""
+    function = getattr(load_funchub(), name)
+    for i in np.flatnonzero(pending):
+        try:
+            out[i] = function(batch.row(i), engine="float")
+        except Exception:
+            out[i] = None
+    return out
+
+
+def float_batch(name, batch, x, error=0.0):
+    with np.errstate(all='ignore'):
+        out, pending = normalize_batch(x, batch.fallback, error)
+    return finish(batch, name, out, pending)
+
+
+def int_batch(name, batch, x):
+    fast = ~batch.fallback & batch.ints
+    out = np.empty(len(x), dtype=object)
+    out[fast] = x[fast].astype(str).tolist()
+    return finish(batch, name, out, ~fast)
+
+
+def int_rows(batch, lengths):
+    """Whether batch is a ragged list of non-empty rows of Python ints only."""
+    return lengths is None and all(batch) and set(map(type, chain.from_iterable(batch))) == {int}
+
+
+def exact_int_batch(name, rows, compute, bounded=True):
+    """Rows of Python ints, computed with exact integers and formatted like the scalar function.
+
+    Integer results are formatted with str() in the scalar functions too, so converting to float64 and
+    back to strings is slower than staying in Python. bounded results follow normalize() (OverflowError,
+    i.e. None, beyond INTEGER_MAX_BITS); the others are formatted with format_integer.
+    """
+    funchub = load_funchub()
+    results = compute(rows)
+    limit = 1 << funchub.INTEGER_MAX_BITS
+    if not bounded:
+        try:
+            strings = list(map(str, results))
+        except ValueError:
+            # 超过 int 转 str 的位数限制
+            strings = list(map(funchub.format_integer, results))
+    elif -limit < min(results) and max(results) < limit:
+        strings = list(map(str, results))
+    else:
+        strings = [str(x) if -limit < x < limit else None for x in results]
+    out = np.empty(len(strings), dtype=object)
+    out[:] = strings
+    if bounded and None in strings:
+        function = getattr(funchub, name)
+        for i in np.flatnonzero(np.equal(out, None)):
+            try:
+                out[i] = function(list(rows[i]), engine="float")
+            except Exception:
+                out[i] = None
+    return out
+
+
+def add_batch(batch, lengths=None):
+    if int_rows(batch, lengths):
+        return exact_int_batch("add_", batch, lambda rows: list(map(sum, rows)))
+    batch = Batch(batch, lengths)
+    if COMPENSATED_SUM:
+        batch.fallback |= ~batch.ints & (batch.lengths > 2)
+    with np.errstate(all='ignore'):
+        x = fold(batch, np.add)
+    return float_batch("add_", batch, x)
+
+
+def subtract_batch(batch, lengths=None):
+    if int_rows(batch, lengths):
+        return exact_int_batch("subtract_", batch, lambda rows: [row[0] - sum(row[1:]) for row in rows])
+    batch = Batch(batch, lengths)
+    with np.errstate(all='ignore'):
+        x = fold(batch, np.subtract)
+    return float_batch("subtract_", batch, x)
+
+
+def multiply_batch(batch, lengths=None):
+    if int_rows(batch, lengths):
+        return exact_int_batch("multiply_", batch, lambda rows: list(map(math.prod, rows)))
+    batch = Batch(batch, lengths)
+    with np.errstate(all='ignore'):
+        x = fold(batch, np.multiply)
+    return float_batch("multiply_", batch, x)
+
+
+def divide_batch(batch, lengths=None):
+    batch = Batch(batch, lengths)
+    with np.errstate(all='ignore'):
+        x = fold(batch, np.divide, invalid=lambda acc, arg: arg == 0)
+    return float_batch("divide_", batch, x)
+
+
+def power_batch(batch, lengths=None):
+    batch = Batch(batch, lengths)
+    # 负数的非整数次幂在 Python 中得到复数，0 的负数次幂抛出异常
+    invalid = lambda acc, arg: ((acc < 0) & (arg != np.trunc(arg))) | ((acc == 0) & (arg < 0))
+    with np.errstate(all='ignore'):
+        x = fold(batch, np.power, invalid=invalid)
+    return float_batch("power_", batch, x, LIBM_ERROR)
+
+
+def sqrt_batch(batch, lengths=None):
+    batch = Batch(batch, lengths)
+    with np.errstate(all='ignore'):
+        x = np.sqrt(batch.column(0))
+    return float_batch("sqrt_", batch, x)
+
+
+def log_batch(batch, lengths=None):
+    batch = Batch(batch, lengths)
+    # 真数或底数不为正时 math.log 抛出异常
+    batch.fallback |= (batch.lengths > 2) | (batch.column(0) <= 0) | ((batch.lengths == 2) & (batch.column(1) <= 0))
+    with np.errstate(all='ignore'):
+        x = np.where(batch.lengths == 2, np.log(batch.column(0)) / np.log(batch.column(1)),
+                     np.log10(batch.column(0)))
+    return float_batch("log_", batch, x, LIBM_ERROR)
+
+
+def ln_batch(batch, lengths=None):
+    batch = Batch(batch, lengths)
+    with np.errstate(all='ignore'):
+        x = np.log(batch.column(0))
+    return float_batch("ln_", batch, x, LIBM_ERROR)
+
+
+def remainder_batch(batch, lengths=None):
+    # 除数为 0 或缺少除数的行会抛出异常，这样的批次走下面的一般路径
+    if int_rows(batch, lengths) and min(map(len, batch)) >= 2 and 0 not in (row[1] for row in batch):
+        return exact_int_batch("remainder_", batch, lambda rows: [row[0] % row[1] for row in rows])
+    batch = Batch(batch, lengths)
+    batch.fallback |= (batch.lengths < 2) | (batch.column(1) == 0)
+    with np.errstate(all='ignore'):
+        x = np.remainder(batch.column(0), batch.column(1))
+    return float_batch("remainder_", batch, x)
+
+
+def gcd_batch(batch, lengths=None):
+    if int_rows(batch, lengths):
+        return exact_int_batch("gcd_", batch, lambda rows: list(starmap(math.gcd, rows)), bounded=False)
+    batch = Batch(batch, lengths)
+    # math.gcd 只接受整数，含浮点数的行由标量函数抛出异常
+    batch.fallback |= ~batch.ints
+    values = np.where(batch.ints[:, None], batch.values, 0).astype(np.int64)
+    # 与 math.gcd(*args) 一样从 0 开始，结果总是非负
+    acc = np.zeros(len(batch.lengths), dtype=np.int64)
+    for j in range(batch.columns):
+        acc = np.where(batch.active(j), np.gcd(acc, values[:, j]), acc)
+    return int_batch("gcd_", batch, acc)
+
+
+def lcm_batch(batch, lengths=None):
+    if int_rows(batch, lengths):
+        return exact_int_batch("lcm_", batch, lambda rows: list(starmap(math.lcm, rows)), bounded=False)
+    batch = Batch(batch, lengths)
+    batch.fallback |= ~batch.ints
+    values = np.where(batch.ints[:, None], batch.values, 0).astype(np.int64)
+    # 与 math.lcm(*args) 一样从 1 开始，结果总是非负，任一参数为 0 时为 0
+    acc = np.ones(len(batch.lengths), dtype=np.int64)
+    for j in range(batch.columns):
+        active = batch.active(j)
+        arg = values[:, j]
+        # 乘积超过 int64 精确范围的行交给标量函数
+        batch.fallback |= active & (np.abs(acc.astype(np.float64) * arg) >= EXACT_INT)
+        with np.errstate(all='ignore'):
+            acc = np.where(active, np.lcm(acc, arg), acc)
+    return int_batch("lcm_", batch, acc)
+
+
+def scalar_batch(name, batch, lengths=None):
+    """Batch wrapper that simply loops over the scalar function (for the big-integer tools)."""
+    batch = Batch(batch, lengths)
+    out = np.empty(len(batch.lengths), dtype=object)
+    return finish(batch, name, out, np.ones(len(batch.lengths), dtype=bool))
+
+
+def choose_batch(batch, lengths=None):
+    return scalar_batch("choose_", batch, lengths)
+
+
+def permutate_batch(batch, lengths=None):
+    return scalar_batch("permutate_", batch, lengths)
+
+
+BATCH_FUNCTIONS = {
+    "add_": add_batch,
+    "subtract_": subtract_batch,
+    "multiply_": multiply_batch,
+    "divide_": divide_batch,
+    "power_": power_batch,
+    "sqrt_": sqrt_batch,
+    "log_": log_batch,
+    "ln_": ln_batch,
+    "choose_": choose_batch,
+    "permutate_": permutate_batch,
+    "gcd_": gcd_batch,
+    "lcm_": lcm_batch,
+    "remainder_": remainder_batch,
+}
+
+
+def call_batch(name, batch, lengths=None):
+    """Batch counterpart of Call_function for funchub: name is the scalar function name, e.g. "add_"."""
+    if name not in BATCH_FUNCTIONS:
+        raise KeyError(f"No function named {name} in {FUNCHUB_PATH}")
+    return BATCH_FUNCTIONS[name](batch, lengths)
@@ -0,0 +1,156 @@
+# — coding: utf-8 –
+"""funchub 整数工具（choose_、permutate_、gcd_、lcm_）的大参数基准测试：
+对比当前基于 math.comb/perm/gcd/lcm 并直接格式化整数的实现，与原来逐项归约后经过浮点 normalize 的实现。
+原实现在结果超出 float 范围时抛出 OverflowError，表中记为 overflow。
+
+--batch 改为测量 funchub_batch 的批量函数相对于逐行调用标量函数的实际加速比（--rows 行随机参数）。
+
+用法: python -m easytool.funchub_benchmark [--repeat 5] [--seed 0]
+      python -m easytool.funchub_benchmark --batch [--rows 100000]
+"""
+import argparse
+import math
+import random
+import time
+from .funchub_batch import call_batch, load_funchub
+
+
+def legacy_normalize(res):
+    funchub = load_funchub()
+    res = str(funchub.custom_round(res))
+    if "." in res:
+        res = res.rstrip("0").strip(".")
+    if "e" in res:
+        res = funchub.scito_decimal(res)
+    return res
+
+
+def legacy_gcd(args):
+    res = args[0]
+    for arg in args[1:]:
+        res = math.gcd(res, arg)
+    return legacy_normalize(res)
+
+
+def legacy_lcm(args):
+    res = args[0]
+    for arg in args[1:]:
+        res = res * arg // math.gcd(res, arg)
+    return legacy_normalize(res)
+
+
+LEGACY = {
+    "choose_": lambda args: legacy_normalize(math.comb(args[0], args[1])),
+    "permutate_": lambda args: legacy_normalize(math.perm(args[0], args[1])),
+    "gcd_": legacy_gcd,
+    "lcm_": legacy_lcm,
+}
+
+
+def make_cases(seed=0):
+    """[(name, label, args)] with small, float-range and far beyond float-range results."""
+    rng = random.Random(seed)
+    factor = rng.getrandbits(256) | 1
+    return [
+        ("choose_", "C(60, 30)", [60, 30]),
+        ("choose_", "C(1000, 500)", [1000, 500]),
+        ("choose_", "C(20000, 10000)", [20000, 10000]),
+        ("permutate_", "P(100, 50)", [100, 50]),
+        ("permutate_", "P(5000, 2500)", [5000, 2500]),
+        ("gcd_", "1000 x 20 digits", [rng.randrange(10 ** 19, 10 ** 20) * 6 for _ in range(1000)]),
+        ("gcd_", "1000 x 300 digits", [rng.getrandbits(1000) * factor for _ in range(1000)]),
+        ("lcm_", "50 x 6 digits", [rng.randrange(10 ** 5, 10 ** 6) for _ in range(50)]),
+        ("lcm_", "200 x 6 digits", [rng.randrange(10 ** 5, 10 ** 6) for _ in range(200)]),
+        ("lcm_", "100 x 100 digits", [rng.getrandbits(330) for _ in range(100)]),
+    ]
+
+
+def make_batch_cases(rows, seed=0):
+    """[(name, label, argument lists)] for the batch benchmark: integer and two-decimal float arguments."""
+    rng = random.Random(seed)
+    ints = lambda low, high: [[rng.randrange(low, high), rng.randrange(low, high)] for _ in range(rows)]
+    floats = lambda low, high: [[round(rng.uniform(low, high), 2), round(rng.uniform(low, high), 2)]
+                                for _ in range(rows)]
+    return [
+        ("add_", "int", ints(1, 10 ** 6)),
+        ("add_", "float", floats(0, 1000)),
+        ("subtract_", "int", ints(1, 10 ** 6)),
+        ("multiply_", "int", ints(1, 10 ** 4)),
+        ("multiply_", "float", floats(0, 100)),
+        ("divide_", "int", ints(1, 10 ** 4)),
+        ("divide_", "float", floats(1, 100)),
+        ("power_", "float", [[round(rng.uniform(0, 10), 2), rng.randrange(0, 5)] for _ in range(rows)]),
+        ("sqrt_", "float", [[round(rng.uniform(0, 10 ** 4), 2)] for _ in range(rows)]),
+        ("log_", "float", [[round(rng.uniform(1, 10 ** 4), 2)] for _ in range(rows)]),
+        ("remainder_", "int", ints(1, 10 ** 6)),
+        ("gcd_", "int", ints(1, 10 ** 6)),
+        ("lcm_", "int", ints(1, 10 ** 4)),
+    ]
+
+
+def scalar_loop(name):
+    """The scalar funchub function applied row by row, with None where it raises (like call_batch)."""
+    function = getattr(load_funchub(), name)
+
+    def run(rows):
+        out = []
+        for row in rows:
+            try:
+                out.append(function(row, engine="float"))
+            except Exception:
+                out.append(None)
+        return out
+    return run
+
+
+def benchmark_batch(rows, repeat, seed):
+    print(f"{'tool':<12} {'args':<6} {'rows':>7} {'scalar':>9} {'batch':>9}  speedup")
+    for name, label, case in make_batch_cases(rows, seed):
+        scalar_time, scalar = measure(scalar_loop(name), case, repeat)
+        batch_time, batch = measure(lambda args: list(call_batch(name, args)), case, repeat)
+        if batch != scalar:
+            raise AssertionError(f"{name} {label}: batch results differ from the scalar function")
+        print(f"{name:<12} {label:<6} {rows:>7} {scalar_time * 1e3:>7.1f}ms {batch_time * 1e3:>7.1f}ms  "
+              f"{scalar_time / batch_time:.2f}x")
+
+
+def measure(function, args, repeat):
+    """(best time in seconds, result or exception class name)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = function(args)
+        except (OverflowError, ValueError) as e:
+            result = type(e).__name__
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the big-integer funchub tools")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch', action='store_true', help="measure funchub_batch against the scalar loop")
+    parser.add_argument('--rows', type=int, default=100000, help="rows per case for --batch")
+    args = parser.parse_args()
+    if args.batch:
+        benchmark_batch(args.rows, args.repeat, args.seed)
+        return
+    funchub = load_funchub()
+    print(f"{'tool':<12} {'case':<20} {'digits':>7} {'current':>11} {'legacy':>11}  speedup")
+    for name, label, case in make_cases(args.seed):
+        current_time, current = measure(getattr(funchub, name), case, args.repeat)
+        legacy_time, legacy = measure(LEGACY[name], case, args.repeat)
+        if legacy in ("OverflowError", "ValueError"):
+            legacy_column, speedup = legacy.replace("Error", "").lower(), "-"
+        else:
+            if legacy != current:
+                raise AssertionError(f"{name} {label}: results differ")
+            legacy_column, speedup = f"{legacy_time * 1e3:.3f}ms", f"{legacy_time / current_time:.1f}x"
+        print(f"{name:<12} {label:<20} {len(current):>7} {current_time * 1e3:>9.3f}ms {legacy_column:>11}  {speedup}")
+
+
+if __name__ == '__main__':
+    main()
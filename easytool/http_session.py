@@ -0,0 +1,77 @@
+# — coding: utf-8 –
+"""ToolBench 工具模块共享的 keep-alive HTTP 连接池，工具代码无需修改即可复用连接。"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# 连接池中最多保留多少个主机的连接池，以及每个主机保留的连接数
+POOL_HOSTS = int(os.environ.get("TOOL_HTTP_POOL_HOSTS", 64))
+POOL_MAXSIZE = int(os.environ.get("TOOL_HTTP_POOL_MAXSIZE", 8))
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class SessionRequests:
+    """Stand-in for the requests module inside a tool module.
+
+    The request helpers go through the shared session; every other attribute
+    (exceptions, Response, ...) falls through to the real requests module.
+    """
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        return get_session().request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request("GET", url, params=params, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request("OPTIONS", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request("PATCH", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+session_requests = SessionRequests()
+
+
+def inject_session(module):
+    """Route a loaded tool module's HTTP calls (``requests.get(...)`` or
+    ``from requests import get``) through the shared session."""
+    if getattr(module, "requests", None) is requests:
+        module.requests = session_requests
+    for name in ("request", "get", "options", "head", "post", "put", "patch", "delete"):
+        if getattr(module, name, None) is getattr(requests, name):
+            setattr(module, name, getattr(session_requests, name))
+    return module
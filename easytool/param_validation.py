@@ -0,0 +1,173 @@
+# — coding: utf-8 –
+"""调用前的参数校验：根据工具说明中的 required/optional 参数定义编译校验器，
+在发起网络请求之前完成类型转换，并在本地拒绝注定失败的调用。"""
+import json
+import re
+import threading
+from .util import change_name
+
+_validators = {}
+_lock = threading.Lock()
+
+
+def normalize_key(name):
+    """Same key normalization Call_function falls back to (lowercase, '-' -> '_')."""
+    return change_name(str(name).lower().replace("-", "_").replace("\\", ""))
+
+
+def find_parameter_list(guideline, name):
+    """Look up required_parameters / optional_parameters regardless of key case."""
+    for key, value in guideline.items():
+        if key.lower() == name and isinstance(value, list):
+            return value
+    return None
+
+
+def coerce_number(value):
+    if isinstance(value, bool):
+        raise ValueError("expected a number, got a boolean")
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def coerce_boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "1", "yes"):
+        return True
+    if text in ("false", "0", "no"):
+        return False
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+
+def coerce_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        parsed = json.loads(value)
+        if isinstance(parsed, list):
+            return parsed
+    raise ValueError(f"expected a list, got {value!r}")
+
+
+def coerce_object(value):
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        parsed = json.loads(value)
+        if isinstance(parsed, dict):
+            return parsed
+    raise ValueError(f"expected an object, got {value!r}")
+
+
+def coerce_string(value):
+    if isinstance(value, (dict, list, tuple)):
+        raise ValueError(f"expected a string, got {type(value).__name__}")
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def coerce_any(coercers):
+    """Coercer for a union type such as "String | List": the first coercer that accepts the value wins."""
+    def coerce(value):
+        error = None
+        for coercer in coercers:
+            try:
+                return coercer(value)
+            except (ValueError, TypeError) as e:
+                error = e
+        raise error
+    return coerce
+
+
+def coercer_for(type_name):
+    type_name = str(type_name or "").strip().lower()
+    names = [name for name in re.split(r'\s*\|\s*|\s+or\s+', type_name) if name]
+    if len(names) > 1:
+        return coerce_any([coercer_for(name) for name in names])
+    if type_name.startswith(("number", "integer", "int", "float")):
+        return coerce_number
+    if type_name.startswith(("boolean", "bool")):
+        return coerce_boolean
+    if type_name.startswith(("array", "list")):
+        return coerce_list
+    if type_name.startswith(("object", "dict")):
+        return coerce_object
+    # string、enum、date、time、geopoint 等都按字符串传给接口
+    return coerce_string
+
+
+class ParameterValidator:
+    def __init__(self, guideline):
+        required = find_parameter_list(guideline, "required_parameters")
+        optional = find_parameter_list(guideline, "optional_parameters")
+        # 说明中没有参数定义时不做任何校验
+        self.enabled = required is not None or optional is not None
+        self.required = {}
+        self.params = {}
+        for param in required or []:
+            key = normalize_key(param["name"])
+            self.required[key] = param["name"]
+            self.params[key] = coercer_for(param.get("type"))
+        for param in optional or []:
+            key = normalize_key(param["name"])
+            self.params.setdefault(key, coercer_for(param.get("type")))
+
+    def validate(self, parameters):
+        """Return (coerced_parameters, errors); the call should be skipped if errors is not empty."""
+        if not self.enabled or not isinstance(parameters, dict):
+            return parameters, []
+        coerced, errors = {}, []
+        for key, value in parameters.items():
+            normalized = normalize_key(key)
+            if normalized not in self.params:
+                # 未在说明中定义的参数一定会让函数调用报错，直接丢弃
+                print(f"Drop unknown parameter: {key}")
+                continue
+            if value is None:
+                continue
+            if isinstance(value, str) and not value.strip() and normalized not in self.required \
+                    and self.params[normalized] is not coerce_string:
+                # 可选的数值/布尔/列表参数留空等于不传
+                continue
+            try:
+                coerced[key] = self.params[normalized](value)
+            except (ValueError, TypeError) as e:
+                errors.append(f"{key}: {e}")
+        present = {normalize_key(key) for key, value in parameters.items() if value is not None}
+        for key, name in self.required.items():
+            if key not in present:
+                errors.append(f"missing required parameter {name}")
+        return coerced, errors
+
+
+def reject(api, parameters, errors):
+    """Remember on the api_result entry that a parameter set was rejected, for the result record."""
+    api.setdefault("rejected", []).append({"parameters": parameters, "errors": errors})
+
+
+def rejected_parameters(api_result):
+    """[{"api_name", "parameters", "errors"}] for every call retrieval() rejected locally."""
+    return [{"api_name": api.get("api_name"), **rejection}
+            for api in (api_result if isinstance(api_result, list) else [])
+            if isinstance(api, dict) for rejection in api.get("rejected", [])]
+
+
+def get_validator(tool_name, api_name, guideline):
+    """Compile the validator for one API once and reuse it afterwards."""
+    key = (tool_name, api_name)
+    validator = _validators.get(key)
+    if validator is None:
+        with _lock:
+            validator = _validators.get(key)
+            if validator is None:
+                validator = ParameterValidator(guideline if isinstance(guideline, dict) else {})
+                _validators[key] = validator
+    return validator
@@ -0,0 +1,233 @@
+# — coding: utf-8 –
+"""FuncQA 子任务参数的规则抽取：从子任务文本中找出数值操作数和对前面子任务结果的引用
+（如 "Multiply X km/min by 45 min to get Y by 'multiply_'" 中的 X、"the result of task 1"），
+按 funchub 工具的参数顺序组装成 {"input": [...]}。
+
+只有能确定全部操作数及其顺序时才返回参数，否则返回 None，由 choose_parameter 交给LLM。
+"""
+import re
+
+NUMBER = r'(?:\d{1,3}(?:,\d{3})+(?!\d)|\d+)(?:\.\d+)?(?:[eE][-+]?\d+)?|\.\d+'
+# 操作数："-" 只有紧贴数字且前面不是数字/字母时才算负号；"$12" 中的 "$" 忽略。
+# 紧跟字母或 "%" 的数字（"2nd"、"11%"）不算操作数，会留在文本中使抽取失败
+NUMBER_PATTERN = re.compile(r'(?<![\w.$-])(-(?=[\d.]))?\$?(' + NUMBER + r')(?![\w%])(?!\.\d)')
+# 步骤编号 "Step 1:"、工具名 'divide_'
+ENUMERATION_PATTERN = re.compile(r'^\s*(?:(?:step|task|subtask)\s*)?\d+\s*[:.)]\s*', re.I)
+TOOL_NAME_PATTERN = re.compile(r"['\"`<]?\b[a-z]+_(?!\w)['\"`>]?", re.I)
+TASK_REFERENCE_PATTERN = re.compile(r'\b(?:task|subtask|step|question)\s*#?\s*(\d+)\b|#(\d+)\b', re.I)
+# "the result" 指上一个子任务；"the result of task 1" 由 TASK_REFERENCE_PATTERN 处理，
+# "the result of log(...)" 说的是当前子任务本身
+PREVIOUS_PATTERN = re.compile(r'\b(?:the|this|that)\s+(?:result|answer)\b(?!\s+(?:of|from|in)\b)|'
+                              r'\b(?:previous|last|prior|above)\s+(?:result|answer|sum|difference|product|'
+                              r'quotient|number|step|task|subtask)\b', re.I)
+VARIABLE_PATTERN = re.compile(r'\b[A-Z]\b')
+# 当前子任务要求出的量，如 "to get Y"、"Convert 23 km/h to X km/min"
+OUTPUT_PATTERN = re.compile(r'\b(?:get|obtain|find|as|call(?:ed)?|named|denoted?|to|into|is)\s+$|=\s*$')
+# 文本中出现这些写法时无法确定数值，交给LLM
+VAGUE_PATTERN = re.compile(
+    r'\b(?:zero|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
+    r'sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred|'
+    r'thousand|million|billion|dozens?|twice|double|triple|half|halves|quarters?|thirds?|percent|pi)\b|'
+    r'[%π^\d]|\*\*', re.I)
+# 未知量 "x"、常数 "e"（"km/h" 这样的单位除外）
+UNKNOWN_PATTERN = re.compile(r'(?<![/\w])(?![ai]\b)[a-z]\b(?!/)')
+# 编号和年份（"day 3"、"group 2"、"in 2019"）不是操作数，出现时交给LLM
+LABEL_PATTERN = re.compile(
+    r'\b(?:day|week|month|year|quarter|hour|round|stage|phase|level|grade|class|group|team|section|chapter|'
+    r'page|room|floor|row|column|line|lane|gate|route|bus|table|box|shelf|unit|item|player|version|no\.?|'
+    r'number)s?\s*#?\s*@\d+ |\b(?:in|since|during|until)\s+@(?P<year>\d+) ', re.I)
+
+# 交换律工具不写成 add(...) 这样的调用时按二元运算抽取
+COMMUTATIVE = {"add_", "multiply_", "gcd_", "lcm_"}
+COMMUTATIVE_ARITY = 2
+INTEGER_TOOLS = {"gcd_", "lcm_", "choose_", "permutate_"}
+
+# 顺序相关的工具：(模式, 参数顺序)，模式中的 @k 是第 k 个操作数，GAP 中不能出现其他操作数
+GAP = r'[^@]*?'
+A = r'@(?P<a>\d+)'
+B = r'@(?P<b>\d+)'
+DIVISION = [
+    (rf'\bdivide\b{GAP}{A}{GAP}\b(?:by|into|among|between|over)\b{GAP}{B}', "ab"),
+    (rf'{A}{GAP}\bdivided\s+(?:by|into|among|between)\b{GAP}{B}', "ab"),
+    (rf'{A}\s*/\s*{B}', "ab"),
+    (rf'\b(?:ratio|quotient)\s+of\b{GAP}{A}{GAP}\b(?:to|and|by)\b{GAP}{B}', "ab"),
+]
+ORDERED_PATTERNS = {
+    "subtract_": [
+        (rf'\b(?:subtract|deduct|take\s+away|remove)\b{GAP}{B}{GAP}\bfrom\b{GAP}{A}', "ab"),
+        (rf'{A}{GAP}\bminus\b{GAP}{B}', "ab"),
+        (rf'{A}\s+-\s+{B}', "ab"),
+        (rf'\bdifference\s+between\b{GAP}{A}{GAP}\band\b{GAP}{B}', "ab"),
+    ],
+    "divide_": DIVISION,
+    "remainder_": DIVISION + [
+        (rf'{A}\s*\b(?:mod|modulo)\b\s*{B}', "ab"),
+        (rf'\bremainder\s+of\b{GAP}{A}{GAP}\b(?:by|and)\b{GAP}{B}', "ab"),
+    ],
+    "power_": [
+        (rf'{A}{GAP}\b(?:to\s+the\s+power\s+of|raised\s+to(?:\s+the\s+power\s+of)?|power\s+of)\s*{B}', "ab"),
+        (rf'\braise\b{GAP}{A}{GAP}\bto\b{GAP}{B}', "ab"),
+        (rf'\bsquare\s+of\b{GAP}{A}', "a2"),
+        (rf'{A}\s+squared\b', "a2"),
+        (rf'\bcube\s+of\b{GAP}{A}', "a3"),
+        (rf'{A}\s+cubed\b', "a3"),
+    ],
+    "log_": [
+        (rf'\blog(?:arithm)?\b{GAP}\bbase\s+{B}\s+of\b{GAP}{A}', "ab"),
+        (rf'\blog(?:arithm)?\b{GAP}\bof\b{GAP}{A}{GAP}\bbase\s+{B}', "ab"),
+        (rf'^(?!.*\b(?:base|natural)\b).*\blog(?:arithm)?\b{GAP}{A}', "a"),
+    ],
+    "choose_": [
+        (rf'{A}\s+choose\s+{B}', "ab"),
+        (rf'\b(?:choose|select|pick|form|chosen|selected|picked|combinations?\s+of)\b{GAP}{B}{GAP}'
+         rf'\b(?:from|out\s+of|among)\b{GAP}{A}', "ab"),
+    ],
+    "permutate_": [
+        (rf'\b(?:arrange|order|permute|permutations?\s+of|arrangements?\s+of)\b{GAP}{B}{GAP}'
+         rf'\b(?:from|out\s+of|of|among)\b{GAP}{A}', "ab"),
+        (rf'\b(?:arrange|permute|permutations?\s+of|arrangements?\s+of)\b{GAP}{A}', "aa"),
+    ],
+}
+UNARY = {"sqrt_", "ln_"}
+
+
+def parse_value(text):
+    """int for integer literals, float otherwise; None if text is not a single number."""
+    text = text.strip().replace(",", "")
+    if re.fullmatch(r'-?\d+', text):
+        return int(text)
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def answer_value(task_id, task_depend, results):
+    """Numeric result of an earlier subtask: its call result, or the only number in its answer."""
+    if results and results.get(task_id) not in (None, ""):
+        return parse_value(str(results[task_id]))
+    entry = task_depend.get(task_id) if task_depend else None
+    if not isinstance(entry, dict) or not entry.get("answer"):
+        return None
+    numbers = {match.group(0) for match in NUMBER_PATTERN.finditer(str(entry["answer"]))}
+    return parse_value(numbers.pop()) if len(numbers) == 1 else None
+
+
+def previous_tasks(task, task_depend):
+    """[(id, text)] of the subtasks before task (all of them if task is not in task_depend)."""
+    tasks = [(key, value.get("task", "")) for key, value in (task_depend or {}).items()
+             if key != 'Original Question' and isinstance(value, dict)]
+    for position, (_, text) in enumerate(tasks):
+        if text == task:
+            return tasks[:position]
+    return tasks
+
+
+def find_operands(task, task_depend=None, results=None):
+    """(skeleton, values): task with its operands replaced by "@k" and the k-th operand's value.
+
+    Returns None when the text contains something whose value cannot be determined.
+    """
+    text = TOOL_NAME_PATTERN.sub(" ", ENUMERATION_PATTERN.sub("", task))
+    # 括号中的逗号总是分隔参数："gcd(144,126,112)" 不是千位分隔的一个数
+    text = re.sub(r'\(([^()]*)\)', lambda m: "(" + m.group(1).replace(",", ", ") + ")", text)
+    earlier = previous_tasks(task, task_depend)
+    values = []
+    pieces = []
+
+    def operand(value):
+        pieces.append(f" @{len(values)} ")
+        values.append(value)
+
+    def reference(task_id):
+        value = answer_value(task_id, task_depend, results)
+        if value is None:
+            raise ValueError(task_id)
+        operand(value)
+
+    position = 0
+    spans = [(m.start(), m.end(), "task", m) for m in TASK_REFERENCE_PATTERN.finditer(text)]
+    spans += [(m.start(), m.end(), "previous", m) for m in PREVIOUS_PATTERN.finditer(text)]
+    spans += [(m.start(), m.end(), "variable", m) for m in VARIABLE_PATTERN.finditer(text)]
+    spans += [(m.start(), m.end(), "number", m) for m in NUMBER_PATTERN.finditer(text)]
+    try:
+        for start, end, kind, match in sorted(spans, key=lambda span: span[0]):
+            if start < position:
+                continue
+            pieces.append(text[position:start])
+            position = end
+            if kind == "number":
+                operand(parse_value((match.group(1) or "") + match.group(2)))
+            elif kind == "task":
+                reference(int(match.group(1) or match.group(2)))
+            elif kind == "previous":
+                if not earlier:
+                    return None
+                reference(earlier[-1][0])
+            else:
+                name = match.group(0)
+                source = [key for key, other in earlier if re.search(rf'\b{name}\b', other)]
+                if name in "AI" and re.match(r' [a-z]', text[end:end + 2]):
+                    # 冠词 "A car"、代词 "I have"
+                    pieces.append(name)
+                elif source:
+                    reference(source[0])
+                elif re.search(r'\b[A-Z][a-z]+\s+$', text[:start]):
+                    # 标签 "Machine A"、"Assignment B"
+                    pieces.append(name)
+                elif OUTPUT_PATTERN.search(text[:start]):
+                    pieces.append(" ")
+                else:
+                    return None
+    except ValueError:
+        return None
+    pieces.append(text[position:])
+    skeleton = "".join(pieces)
+    rest = re.sub(r' @\d+ ', ' ', skeleton)
+    if VAGUE_PATTERN.search(rest) or UNKNOWN_PATTERN.search(rest):
+        return None
+    return skeleton, values
+
+
+def order_operands(tool_name, skeleton, values):
+    """Operands in the order the tool expects, or None if the text does not determine it."""
+    call = re.search(rf'\b{tool_name.rstrip("_")}\s*\(((?:\s*@\d+\s*,)*\s*@\d+\s*)\)', skeleton, re.I)
+    if call:
+        indices = [int(index) for index in re.findall(r'@(\d+)', call.group(1))]
+        return [values[i] for i in indices] if sorted(indices) == list(range(len(values))) else None
+    for match in LABEL_PATTERN.finditer(skeleton):
+        year = match.group("year")
+        if year is None or (isinstance(values[int(year)], int) and 1000 <= values[int(year)] <= 2100):
+            return None
+    if tool_name in COMMUTATIVE:
+        # 数字个数与运算的元数不符（如 "Add the 12 apples bought on day 3 to the 7 apples"）时无法确定操作数
+        return values if len(values) == COMMUTATIVE_ARITY else None
+    if tool_name in UNARY:
+        return values if len(values) == 1 else None
+    for pattern, order in ORDERED_PATTERNS.get(tool_name, []):
+        match = re.search(pattern, skeleton, re.I)
+        if match is None:
+            continue
+        used = {int(index) for index in match.groupdict().values() if index is not None}
+        if used != set(range(len(values))):
+            continue
+        picked = {name: values[int(index)] for name, index in match.groupdict().items() if index is not None}
+        return [picked[name] if name in picked else int(name) for name in order]
+    return None
+
+
+def extract_parameters(task, tool_name, task_depend=None, results=None):
+    """{"input": [...]} for a funchub tool from a FuncQA subtask, or None when not confident.
+
+    task_depend is funcQA's {'Original Question': ..., id: {'task': ..., 'answer': ...}} log and results
+    optionally maps subtask ids to their call results, used for references to earlier subtasks.
+    """
+    found = find_operands(task, task_depend, results)
+    if found is None:
+        return None
+    args = order_operands(tool_name, *found)
+    if not args or any(arg is None for arg in args):
+        return None
+    if tool_name in INTEGER_TOOLS and not all(isinstance(arg, int) for arg in args):
+        return None
+    return {"input": args}
@@ -22,28 +22,13 @@ import importlib.util
 from sklearn.metrics.pairwise import cosine_similarity
 import pickle
 from .util import *
+from .run_journal import preview
 
 from tqdm import tqdm
 
 openai.api_key = os.environ["OPENAI_API_KEY"]
 
 
-def get_last_processed_index(progress_file):
-    """Retrieve the last processed index from the progress file."""
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            last_index = f.read().strip()
-            return int(last_index) if last_index else 0
-    else:
-        return 0
-
-
-def update_progress(progress_file, index):
-    """Update the last processed index in the progress file."""
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        f.write(str(index))
-
-
 def task_decompose(question, Tool_dic, model_name):
     chat = ChatOpenAI(model_name=model_name, openai_api_base="https://api.deepseek.com/v1")
     template = "You are a helpful assistant."
@@ -83,10 +68,11 @@ def task_decompose(question, Tool_dic, model_name):
 
 
 def task_execution(
-        Tool_dic, dic_tool, test_data, progress_file,
+        Tool_dic, dic_tool, test_data, journal,
         start_index, total_files, retrieval_num, ind, model_name):
     with tqdm(total=total_files, desc="Processing files", initial=start_index) as pbar:
-        for i, data in enumerate(test_data[start_index:], start=start_index):
+        for i in journal.pending():
+            data = test_data[i]
             question = data["query"]
             print(question)
             task_path = task_decompose(question, Tool_dic, model_name)
@@ -94,8 +80,9 @@ def task_execution(
             # 添加检查：如果 task_decompose 失败返回 -1，跳过当前任务
             if task_path == -1:
                 print(f"Task decompose failed for question: {question}")
-                ind = ind + 1
-                update_progress(progress_file, i + 1)
+                ind = i + 1
+                # 提交一条跳过记录，续跑时不再无休止地重试
+                journal.commit(i, {"ID": ind, "question": question, "skipped": "task_decompose"})
                 pbar.update(1)
                 continue
                 
@@ -106,15 +93,12 @@ def task_execution(
                         tool_choice_ls.append(dic_tool[ele]['tool_usage'])
                 elif int(task["ID"]) in dic_tool.keys():
                     tool_choice_ls.append(dic_tool[task["ID"]]['tool_usage'])
-            ind = ind + 1
-            with open(f"restbench_{model_name}_Easytool.jsonl", 'a+', encoding='utf-8') as f:
-                line = json.dumps({
-                    "ID": ind,
-                    "question": question,
-                    "task_path": task_path,
-                    "tool_choice_ls": tool_choice_ls
-                }, ensure_ascii=False)
-                f.write(line + '\n')
-            print(tool_choice_ls)
-            update_progress(progress_file, i + 1)
+            ind = i + 1
+            journal.commit(i, {
+                "ID": ind,
+                "question": question,
+                "task_path": task_path,
+                "tool_choice_ls": tool_choice_ls
+            })
+            print(preview(tool_choice_ls))
             pbar.update(1)
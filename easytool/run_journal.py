@@ -0,0 +1,245 @@
+# — coding: utf-8 –
+"""运行日志：结果文件（如 FuncQA_funcqa_mh_<model>_easytool.jsonl）本身就是断点续跑的依据。
+每个完成的问题以一行完整的JSON结果提交，行中带有它在测试集中的位置 "index"；
+不再另写进度文件，因此不会出现结果已写入而进度未更新（或相反）的情况。
+
+结果由 ResultWriter 的后台线程序列化，按条数/时间成批地用一次 write 追加整行并 fsync，关闭时写完剩余的记录，
+任务循环中不再为每个问题打开文件和序列化结果。启动时扫描已有结果：崩溃留下的不完整末行会被截掉，
+已提交的 index 不再重复执行。没有 "index" 字段的旧结果文件按原来的进度文件（.txt）确定已完成的问题。
+
+main.py --shard i/N 只执行 index % N == i 的问题，结果写入各自的分片文件（*.shard<i>of<N>.jsonl），
+全部完成后合并回按 index 排序的结果文件。
+
+用法: python -m easytool.run_journal FuncQA_funcqa_mh_<model>_easytool.jsonl --shards 4
+"""
+import argparse
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+from .util import get_last_processed_index
+
+FLUSH_SIZE = int(os.environ.get("RESULT_FLUSH_SIZE", "16"))
+FLUSH_INTERVAL = float(os.environ.get("RESULT_FLUSH_INTERVAL", "2"))
+PREVIEW_CHARS = int(os.environ.get("RESULT_PREVIEW_CHARS", "300"))
+
+
+def scan(path):
+    """(completed indices, number of records without an index, offset after the last intact record)."""
+    done = set()
+    legacy = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')
+    # 最后一段要么为空（文件以换行结尾），要么是没有写完的记录
+    for position, line in enumerate(lines[:-1]):
+        try:
+            record = json.loads(line) if line.strip() else None
+        except ValueError:
+            if position == len(lines) - 2 and not lines[-1]:
+                # 最后一行不完整的JSON同样视为写了一半
+                break
+            print(f"Run journal {path}: skipping unreadable record at byte {offset}")
+            record = None
+        offset += len(line) + 1
+        if isinstance(record, dict) and isinstance(record.get("index"), int):
+            done.add(record["index"])
+        elif record is not None:
+            legacy += 1
+    return done, legacy, offset
+
+
+def parse_shard(text):
+    """(i, N) from "i/N" with 0 <= i < N, for argparse."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', text)
+    if match is None or not 0 <= int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"shard must look like i/N with 0 <= i < N, got {text!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def shard_indices(total, shard=None):
+    """The questions of shard (i, N): every index with index % N == i (all of range(total) without a shard)."""
+    if shard is None:
+        return list(range(total))
+    return list(range(shard[0], total, shard[1]))
+
+
+def shard_path(path, shard):
+    """Result file of one shard, e.g. G2_gpt-4_Easytool.jsonl -> G2_gpt-4_Easytool.shard0of4.jsonl."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard[0]}of{shard[1]}{ext}"
+
+
+def read_records(path):
+    """All intact records of a results file, in file order."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+    return records
+
+
+def merge(path, sources):
+    """Combine the records of `sources` (and those already in `path`) into `path`, ordered by index.
+
+    A question with records in several files keeps the first one found. Records without an index
+    (written before the run journal existed) stay at the front in their original order.
+    Returns (number of records written, indices missing below the largest one).
+    """
+    legacy = []
+    by_index = {}
+    for source in [path] + list(sources):
+        if not os.path.exists(source):
+            if source != path:
+                print(f"Missing result file: {source}")
+            continue
+        for record in read_records(source):
+            if isinstance(record.get("index"), int):
+                by_index.setdefault(record["index"], record)
+            elif source == path:
+                legacy.append(record)
+    records = legacy + [by_index[index] for index in sorted(by_index)]
+    temp_path = path + ".merge"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    missing = [index for index in range(max(by_index, default=-1) + 1) if index not in by_index]
+    return len(records), missing
+
+
+class ResultWriter:
+    """Keeps one handle on a JSONL file open and appends records from a background thread.
+
+    Records are serialized by the thread and written in batches of whole lines with one write and
+    one fsync each, when flush_size records are waiting, flush_interval seconds have passed, or on close.
+    on_written(records), if given, is called on the thread after each batch is on disk.
+    """
+
+    def __init__(self, path, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, on_written=None):
+        self.path = path
+        self.on_written = on_written
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.queue = queue.Queue()
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="result-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(record)
+
+    def write(self, records):
+        if not records:
+            return
+        data = "".join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+        data = data.encode('utf-8')
+        while data:
+            data = data[os.write(self.fd, data):]
+        os.fsync(self.fd)
+        if self.on_written is not None:
+            self.on_written(records)
+
+    def run(self):
+        buffer = []
+        last_flush = time.time()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+            if record is not None:
+                buffer.append(record)
+            stop = self.closed and self.queue.empty()
+            if stop or len(buffer) >= self.flush_size or time.time() - last_flush >= self.flush_interval:
+                try:
+                    self.write(buffer)
+                except OSError as e:
+                    self.error = e
+                    return
+                buffer = []
+                last_flush = time.time()
+            if stop:
+                return
+
+    def close(self):
+        if self.fd is None:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        os.close(self.fd)
+        self.fd = None
+        if self.error is not None:
+            raise self.error
+
+
+class RunJournal:
+    """Results of the questions range(total) of one test set, or only of one shard (i, N) of it."""
+
+    def __init__(self, path, total, shard=None, legacy_progress_file=None, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.indices = shard_indices(total, shard)
+        self.done = set()
+        if os.path.exists(path):
+            self.done, legacy, offset = scan(path)
+            if offset < os.path.getsize(path):
+                print(f"Run journal {path}: truncating {os.path.getsize(path) - offset} bytes of an incomplete record")
+                os.truncate(path, offset)
+            if legacy and legacy_progress_file:
+                self.done.update(range(get_last_processed_index(legacy_progress_file)))
+        self.writer = ResultWriter(path, flush_size, flush_interval)
+        atexit.register(self.close)
+
+    def pending(self):
+        """Indices of this run that have no committed result, in order."""
+        return [i for i in self.indices if i not in self.done]
+
+    def completed(self):
+        return len(self.indices) - len(self.pending())
+
+    def commit(self, index, record):
+        """Queue the result of test question `index` for writing; it counts as done in this run from here."""
+        self.writer.put({**record, "index": index})
+        self.done.add(index)
+
+    def close(self):
+        self.writer.close()
+
+
+def preview(answer, limit=PREVIEW_CHARS):
+    """The answer as printed to stdout, shortened to limit characters (0 keeps it whole)."""
+    text = str(answer)
+    if limit and len(text) > limit:
+        return text[:limit] + f"... ({len(text)} chars)"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the per-shard result files of a --shard run in question order")
+    parser.add_argument('path', help="canonical result file, e.g. FuncQA_funcqa_mh_gpt-4_easytool.jsonl")
+    parser.add_argument('--shards', type=int, required=True, help="N of the --shard i/N runs")
+    args = parser.parse_args()
+    written, missing = merge(args.path, [shard_path(args.path, (i, args.shards)) for i in range(args.shards)])
+    print(f"{args.path}: {written} records")
+    if missing:
+        print(f"no result for {len(missing)} questions: {missing[:20]}{' ...' if len(missing) > 20 else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# — coding: utf-8 –
+"""问题执行流程的阶段裁剪：在 funcQA/toolbench/toolbench_retrieve 的 task_execution 中，
+根据分解出的子任务形状跳过不会带来任何新信息的阶段，每跳过一个阶段就少一次串行的LLM调用。
+
+- 只有一个子任务时不需要 task_topology（唯一的拓扑就是它本身、没有依赖）；
+- 只有一个子任务且已得到答案时不需要 answer_summarize（最终答案就是该子任务的答案）；
+- 最终答案与问题已经作为某个子任务通过 answer_check 时，不再重复检查。
+
+设置环境变量 STAGE_ELISION=0 可以关闭裁剪，总是执行全部阶段。
+"""
+import os
+
+ENABLED = os.environ.get("STAGE_ELISION", "1") != "0"
+
+
+def question_shape(task_ls):
+    """"single", "chain" (every subtask depends only on the one before it) or "general"."""
+    if len(task_ls) <= 1:
+        return "single"
+    for position, task_dic in enumerate(task_ls):
+        dep = task_dic.get("dep", [-1])
+        expected = [-1] if position == 0 else [task_ls[position - 1].get("id")]
+        if dep != expected:
+            return "general"
+    return "chain"
+
+
+class StagePlan:
+    """Per-question wrapper around the optional stages; records which ones were skipped."""
+
+    def __init__(self, question, model_name, enabled=None):
+        self.question = question
+        self.model_name = model_name
+        self.enabled = ENABLED if enabled is None else enabled
+        self.skipped = []
+        self.checked = set()
+
+    def topology(self, task_ls, task_topology):
+        """task_topology(question, task_ls, model_name), or its only possible result for one subtask."""
+        if self.enabled and len(task_ls) == 1:
+            self.skipped.append("task_topology")
+            return [{"task": task_ls[0]["task"], "id": task_ls[0]["id"], "dep": [-1]}]
+        return task_topology(self.question, task_ls, self.model_name)
+
+    def passed_check(self, task, answer):
+        """Remember a (task, answer) pair that answer_check has accepted."""
+        self.checked.add((task.strip(), answer))
+
+    def summarize(self, answer_task, task_ls, answer_summarize, verified=False):
+        """answer_summarize(question, answer_task, model_name), or the answer of the only subtask.
+
+        verified=True (funcQA --template_answers: every answer was verified locally) skips the
+        summary of a single subtask even when STAGE_ELISION=0.
+        """
+        if (self.enabled or verified) and len(task_ls) == 1 and len(answer_task) == 1:
+            self.skipped.append("answer_summarize")
+            return answer_task[0]['answer']
+        return answer_summarize(self.question, answer_task, self.model_name)
+
+    def check(self, final_answer, answer_check):
+        if self.enabled and (self.question.strip(), final_answer) in self.checked:
+            self.skipped.append("answer_check")
+            return 1
+        return answer_check(self.question, final_answer, self.model_name)
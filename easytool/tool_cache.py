@@ -0,0 +1,191 @@
+# — coding: utf-8 –
+"""工具调用结果缓存：以 (工具名, API名, 规范化参数) 为键，落盘到 SQLite，支持按工具设置TTL、容量淘汰和不缓存名单。"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 不参与缓存键计算的参数（鉴权信息等）
+IGNORED_KEYS = {"toolbench_rapidapi_key"}
+# 工具返回的错误内容（限流、超时、上游故障等），这些结果不写入缓存
+ERROR_KEYS = ("error", "errors", "error_message", "errorMessage")
+STATUS_KEYS = ("status", "status_code", "statusCode")
+MESSAGE_KEYS = ("message", "messages", "msg", "detail")
+ERROR_MESSAGE_PREFIX = 300
+ERROR_MESSAGE_PATTERN = re.compile(
+    r"rate.?limit|too many requests|quota|exceeded the (?:daily|monthly|hourly|rate)|timed?.?out|timeout|"
+    r"service unavailable|temporarily unavailable|internal server error|bad gateway|gateway time|"
+    r"not subscribed|unauthorized|forbidden|invalid api key|connection (?:error|refused|reset|aborted)|"
+    r"max retries exceeded|api doesn't exist|endpoint '?[^']*'? does not exist", re.I)
+
+_cache = None
+
+
+def canonical_value(value):
+    """Normalize a parameter value so that equivalent LLM outputs map to the same key."""
+    if isinstance(value, dict):
+        return {str(k): canonical_value(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [canonical_value(v) for v in value]
+    if isinstance(value, bool):
+        return str(value).lower()
+    if value is None:
+        return None
+    # RapidAPI 的参数最终都会被序列化成字符串，34 和 "34" 视为同一个参数
+    return str(value).strip()
+
+
+def canonical_arguments(arg):
+    """Canonicalize a Call_function argument dict: normalized keys, sorted, auth keys dropped."""
+    canonical = {}
+    for key, value in arg.items():
+        if key in IGNORED_KEYS:
+            continue
+        canonical[str(key).lower().replace("-", "_")] = canonical_value(value)
+    return dict(sorted(canonical.items()))
+
+
+def cache_key(tool_name, api_name, arg):
+    payload = json.dumps([tool_name, api_name, canonical_arguments(arg)], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def is_error_response(result):
+    """Whether a tool returned an error payload instead of data: {"error": ...}, an HTTP error status,
+    or a rate limit / timeout / upstream failure message."""
+    if isinstance(result, str):
+        # 只看开头，避免把正文中恰好出现这些词的正常结果当成错误
+        return ERROR_MESSAGE_PATTERN.search(result[:ERROR_MESSAGE_PREFIX]) is not None
+    if not isinstance(result, dict):
+        return False
+    for key in ERROR_KEYS:
+        if result.get(key) not in (None, "", [], {}):
+            return True
+    for key in STATUS_KEYS:
+        status = result.get(key)
+        if isinstance(status, int) and not isinstance(status, bool) and status >= 400:
+            return True
+        if isinstance(status, str) and status.strip().isdigit() and int(status) >= 400:
+            return True
+    for key in MESSAGE_KEYS:
+        if isinstance(result.get(key), str) and is_error_response(result[key]):
+            return True
+    return False
+
+
+def is_cacheable(result):
+    """Failures (-1, None, missing function messages, error payloads) are never cached."""
+    if result is None or (isinstance(result, int) and result == -1):
+        return False
+    if isinstance(result, str) and result.startswith("No function named"):
+        return False
+    return not is_error_response(result)
+
+
+class ToolCache:
+    def __init__(self, path, default_ttl=86400, ttl=None, no_cache=None, max_entries=100000):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.ttl = ttl or {}
+        self.no_cache = set(no_cache or [])
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, tool TEXT, api TEXT, result TEXT, created REAL, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self.conn.commit()
+
+    def tool_ttl(self, tool_name):
+        """TTL in seconds for a tool; 0 or a tool in no_cache disables caching."""
+        if tool_name in self.no_cache:
+            return 0
+        return self.ttl.get(tool_name, self.default_ttl)
+
+    def get(self, tool_name, api_name, arg):
+        """Return (hit, result)."""
+        ttl = self.tool_ttl(tool_name)
+        if not ttl:
+            return False, None
+        key = cache_key(tool_name, api_name, arg)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT result, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if now - row[1] > ttl:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return False, None
+            self.conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return True, json.loads(row[0])
+
+    def put(self, tool_name, api_name, arg, result):
+        if not self.tool_ttl(tool_name) or not is_cacheable(result):
+            return
+        try:
+            value = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        key = cache_key(tool_name, api_name, arg)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, tool, api, result, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, api_name, value, now, now)
+            )
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        """Drop least recently used entries beyond max_entries (caller holds the lock)."""
+        if not self.max_entries:
+            return
+        count = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def configure(path, config_file=None):
+    """Enable the process-wide cache; config_file is an optional JSON with
+    default_ttl, ttl ({tool_name: seconds}), no_cache ([tool_name]) and max_entries."""
+    global _cache
+    config = {}
+    if config_file:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    _cache = ToolCache(path,
+                       default_ttl=config.get("default_ttl", 86400),
+                       ttl=config.get("ttl"),
+                       no_cache=config.get("no_cache"),
+                       max_entries=config.get("max_entries", 100000))
+    return _cache
+
+
+def cached_call(tool_name, api_name, arg, call):
+    """Return the cached result for this call, or run call() and store its result."""
+    if _cache is None:
+        return call()
+    hit, result = _cache.get(tool_name, api_name, arg)
+    if hit:
+        return result
+    # call() 可能会修改 arg（例如写入 rapidapi key），缓存键需要在调用前确定
+    arg = dict(arg)
+    result = call()
+    _cache.put(tool_name, api_name, arg, result)
+    return result
@@ -0,0 +1,119 @@
+# — coding: utf-8 –
+"""工具健康度：根据 Call_function 的结果和耗时维护每个工具的健康分并持久化，
+在交给 choose_tool 的 Tool_dic 中剔除长期失败的工具、把表现较差的工具排到后面。
+被剔除的工具在恢复窗口过后会重新获得试用机会。"""
+import atexit
+import json
+import os
+import threading
+import time
+
+ALPHA = 0.3
+UNHEALTHY_SCORE = 0.3
+DEGRADED_SCORE = 0.7
+MIN_CALLS = 3
+SLOW_LATENCY = 10.0
+
+_health = None
+
+
+def is_failure(result):
+    """-1, None or a missing function message, which tool_cache.is_cacheable rejects as well."""
+    return result is None or (isinstance(result, int) and result == -1) or \
+        (isinstance(result, str) and result.startswith("No function named"))
+
+
+class ToolHealth:
+    def __init__(self, path, recovery_window=600, save_every=20):
+        self.path = path
+        self.recovery_window = recovery_window
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.tools = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.tools = json.load(f)
+            except ValueError:
+                print(f"Ignore broken tool health file: {path}")
+
+    def record(self, tool_name, ok, latency):
+        # 成功但很慢的调用只算半次成功
+        outcome = 0.0 if not ok else (0.5 if latency > SLOW_LATENCY else 1.0)
+        with self.lock:
+            state = self.tools.setdefault(tool_name, {"score": 1.0, "latency": latency, "calls": 0,
+                                                      "failures": 0, "last_failure": 0.0})
+            state["score"] = (1 - ALPHA) * state["score"] + ALPHA * outcome
+            state["latency"] = (1 - ALPHA) * state["latency"] + ALPHA * latency
+            state["calls"] += 1
+            if not ok:
+                state["failures"] += 1
+                state["last_failure"] = time.time()
+            self.pending += 1
+            save = self.pending >= self.save_every
+        if save:
+            self.save()
+
+    def status(self, tool_name):
+        """"healthy", "degraded" or "unhealthy"."""
+        state = self.tools.get(tool_name)
+        if state is None or state["calls"] < MIN_CALLS:
+            return "healthy"
+        if state["score"] < UNHEALTHY_SCORE:
+            if time.time() - state["last_failure"] < self.recovery_window:
+                return "unhealthy"
+            # 恢复窗口已过，作为较差的工具重新试用
+            return "degraded"
+        if state["score"] < DEGRADED_SCORE:
+            return "degraded"
+        return "healthy"
+
+    def filter_tools(self, Tool_dic, tool_name_of):
+        """Drop unhealthy tools from a [{ID: description}] list and move degraded ones to the end.
+
+        If every tool is unhealthy the list is returned unchanged.
+        """
+        healthy, degraded = [], []
+        for ele in Tool_dic:
+            status = self.status(tool_name_of(list(ele.keys())[0]))
+            if status == "healthy":
+                healthy.append(ele)
+            elif status == "degraded":
+                degraded.append(ele)
+        if not healthy and not degraded:
+            return Tool_dic
+        return healthy + degraded
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.tools, ensure_ascii=False)
+            self.pending = 0
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+
+
+def configure(path, recovery_window=600):
+    global _health
+    _health = ToolHealth(path, recovery_window)
+    atexit.register(_health.save)
+    return _health
+
+
+def tracked_call(tool_name, call):
+    """Run call() and feed its outcome and latency into the tool's health score."""
+    if _health is None:
+        return call()
+    start = time.time()
+    result = call()
+    _health.record(tool_name, not is_failure(result), time.time() - start)
+    return result
+
+
+def filter_tools(Tool_dic, dataset):
+    """Tool_dic as handed to choose_tool, with unhealthy tools removed (no-op when disabled)."""
+    if _health is None:
+        return Tool_dic
+    return _health.filter_tools(Tool_dic, lambda tool_id: dataset[str(tool_id)]["tool_name"])
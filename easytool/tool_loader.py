@@ -0,0 +1,64 @@
+# — coding: utf-8 –
+"""ToolBench 工具模块加载：每个 api.py 只加载一次，并支持在LLM选择工具期间后台预取候选工具的模块。"""
+import importlib.util
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from .http_session import inject_session
+
+_loads = {}
+_lock = threading.Lock()
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(os.environ.get("TOOL_PREFETCH_WORKERS", 4)),
+                                               thread_name_prefix="tool-prefetch")
+    return _executor
+
+
+def import_tool_module(app_path):
+    spec = importlib.util.spec_from_file_location('api', app_path)
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+    return inject_session(app_module)
+
+
+def forget(app_path, future):
+    """Drop a failed load so that the next call retries it."""
+    with _lock:
+        if _loads.get(app_path) is future:
+            del _loads[app_path]
+
+
+def prefetch_tool_modules(app_paths):
+    """Start loading the given api.py files in the background; already loaded ones are skipped."""
+    executor = get_executor()
+    for app_path in app_paths:
+        with _lock:
+            if app_path in _loads:
+                continue
+            future = executor.submit(import_tool_module, app_path)
+            _loads[app_path] = future
+        future.add_done_callback(lambda f, p=app_path: f.exception() is not None and forget(p, f))
+
+
+def load_tool_module(app_path):
+    """Return the loaded api.py module, waiting for a prefetch in flight instead of loading twice."""
+    with _lock:
+        future = _loads.get(app_path)
+        owner = future is None
+        if owner:
+            future = Future()
+            _loads[app_path] = future
+    if owner:
+        try:
+            future.set_result(import_tool_module(app_path))
+        except Exception as e:
+            future.set_exception(e)
+            forget(app_path, future)
+    return future.result()
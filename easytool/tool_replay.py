@@ -0,0 +1,113 @@
+# — coding: utf-8 –
+"""工具调用的录制/回放：录制模式把 Call_function 的请求和结果写入JSONL，回放模式在进程内按请求返回录制结果，
+可配置延迟和错误注入，用于离线、可复现地压测 ToolBench 的工具执行链路。
+
+call_pipeline 是 toolbench/toolbench_retrieve 调用工具的完整链路：录制/回放在最外层，录制时缓存命中的调用同样写入录制文件；
+回放时既不查缓存，也不更新工具健康度（回放和注入的错误不代表工具真的失败）。"""
+import json
+import random
+import threading
+import time
+from . import tool_cache, tool_health
+from .tool_cache import cache_key, canonical_arguments
+
+_mode = None
+_path = None
+_records = {}
+_latency = 0.0
+_error_rate = 0.0
+_rng = random.Random(0)
+_lock = threading.Lock()
+_record_file = None
+
+
+def load_records(path):
+    """Read a recording into {key: {"result": ..., "latency": ...}}; later lines win."""
+    records = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["key"]] = record
+    return records
+
+
+def configure(mode, path, latency="0", error_rate=0.0, seed=0):
+    """mode is "record" or "replay"; latency is seconds per call or "recorded"."""
+    global _mode, _path, _records, _latency, _error_rate, _rng, _record_file
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown tool replay mode: {mode}")
+    _mode = mode
+    _path = path
+    _latency = latency if latency == "recorded" else float(latency)
+    _error_rate = error_rate
+    _rng = random.Random(seed)
+    if mode == "replay":
+        _records = load_records(path)
+        print(f"Loaded {len(_records)} recorded tool calls from {path}")
+    else:
+        _record_file = open(path, 'a+', encoding='utf-8')
+
+
+def record(tool_name, api_name, arg, result, latency):
+    try:
+        json.dumps(result)
+    except (TypeError, ValueError):
+        result = str(result)
+    line = json.dumps({
+        "key": cache_key(tool_name, api_name, arg),
+        "tool": tool_name,
+        "api": api_name,
+        "parameters": canonical_arguments(arg),
+        "result": result,
+        "latency": latency
+    }, ensure_ascii=False)
+    with _lock:
+        _record_file.write(line + '\n')
+        _record_file.flush()
+
+
+def replay(tool_name, api_name, arg):
+    entry = _records.get(cache_key(tool_name, api_name, arg))
+    if _latency == "recorded":
+        delay = entry["latency"] if entry is not None else 0.0
+    else:
+        delay = _latency
+    if delay:
+        time.sleep(delay)
+    with _lock:
+        inject_error = _error_rate and _rng.random() < _error_rate
+    if inject_error:
+        print(f"Injected failure for {tool_name}.{api_name}")
+        return -1
+    if entry is None:
+        print(f"No recorded call for {tool_name}.{api_name} {canonical_arguments(arg)}")
+        return -1
+    return entry["result"]
+
+
+def call_tool(tool_name, api_name, arg, call):
+    """Run call() normally, record it, or answer it from the recording, depending on the mode."""
+    if _mode == "replay":
+        return replay(tool_name, api_name, arg)
+    if _mode == "record":
+        arg = dict(arg)
+        start = time.time()
+        result = call()
+        record(tool_name, api_name, arg, result, time.time() - start)
+        return result
+    return call()
+
+
+def call_pipeline(tool_name, api_name, arg, call):
+    """call() (usually Call_function) behind the recorder/replayer, the result cache and tool health tracking."""
+    return call_tool(
+        tool_name, api_name, arg,
+        lambda: tool_cache.cached_call(
+            tool_name, api_name, arg,
+            lambda: tool_health.tracked_call(tool_name, call)))
@@ -0,0 +1,167 @@
+# — coding: utf-8 –
+"""工具返回结果的整理：按 template_response 投影出有用字段，并按字符预算流式序列化，
+避免为了保留前1000个字符而把整个大响应转成字符串。"""
+import json
+from .util import change_name, standardize
+
+LIST_MARK = '"..."'
+DICT_MARK = '"...": "..."'
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+def emit(text, parts, state):
+    if len(text) > state["left"]:
+        raise BudgetExhausted
+    parts.append(text)
+    state["left"] -= len(text)
+
+
+def rollback(parts, state, size):
+    """Drop everything emitted after parts[:size] and give its budget back."""
+    state["left"] += sum(len(p) for p in parts[size:])
+    del parts[size:]
+
+
+def write_string(s, parts, state):
+    text = json.dumps(s[:state["left"]], ensure_ascii=False)
+    if len(s) <= state["left"] and len(text) <= state["left"]:
+        emit(text, parts, state)
+        return
+    # 放不下整个字符串时截断，并以 ... 结尾，保证仍是合法的JSON字符串
+    n = state["left"] - 5
+    while n > 0:
+        text = json.dumps(s[:n] + "...", ensure_ascii=False)
+        if len(text) <= state["left"]:
+            emit(text, parts, state)
+            break
+        n -= len(text) - state["left"]
+    raise BudgetExhausted
+
+
+def write_items(items, is_dict, parts, state):
+    opener, closer, mark = ("{", "}", DICT_MARK) if is_dict else ("[", "]", LIST_MARK)
+    # 预留出截断标记和右括号的位置，预算用完时也能输出合法的JSON
+    reserve = len(", ") + len(mark) + len(closer)
+    if len(opener) + reserve > state["left"]:
+        raise BudgetExhausted
+    emit(opener, parts, state)
+    start = len(parts)
+    state["left"] -= reserve
+    try:
+        for i, item in enumerate(items):
+            element_start = len(parts)
+            value_start = None
+            try:
+                if i:
+                    emit(", ", parts, state)
+                if is_dict:
+                    key, item = item
+                    emit(json.dumps(str(key), ensure_ascii=False) + ": ", parts, state)
+                value_start = len(parts)
+                write_value(item, parts, state)
+            except BudgetExhausted:
+                # 元素一个字符都没写出来时，连同逗号和键一起撤回
+                if value_start is None or len(parts) == value_start:
+                    rollback(parts, state, element_start)
+                raise
+    except BudgetExhausted:
+        state["left"] += reserve
+        if len(parts) == start:
+            # 一个子元素都放不下时整体撤回，由外层容器标记截断
+            rollback(parts, state, start - 1)
+            raise
+        parts.append(", " + mark + closer)
+        state["left"] -= len(parts[-1])
+        raise
+    state["left"] += reserve
+    emit(closer, parts, state)
+
+
+def write_value(obj, parts, state):
+    if isinstance(obj, dict):
+        write_items(obj.items(), True, parts, state)
+    elif isinstance(obj, (list, tuple, set)):
+        write_items(obj, False, parts, state)
+    elif isinstance(obj, str):
+        write_string(obj, parts, state)
+    elif obj is None or isinstance(obj, (bool, int, float)):
+        emit(json.dumps(obj), parts, state)
+    else:
+        write_string(str(obj), parts, state)
+
+
+def bounded_dumps(obj, budget=1000):
+    """Serialize a call result to at most about `budget` characters.
+
+    Containers are walked lazily and the walk stops as soon as the budget is used up;
+    cut containers end with a "..." element and are still closed, so the text stays
+    valid JSON. Plain string results are simply truncated.
+    """
+    if isinstance(obj, bytes):
+        obj = obj[:budget * 4].decode("utf-8", errors="replace")
+    if isinstance(obj, str):
+        return obj[:budget]
+    parts = []
+    state = {"left": budget}
+    try:
+        write_value(obj, parts, state)
+    except BudgetExhausted:
+        if not parts:
+            return "{" + DICT_MARK + "}" if isinstance(obj, dict) else "[" + LIST_MARK + "]"
+    return "".join(parts)
+
+
+def build_response_templates(api_list):
+    """Map (tool_name, function name) to the template_response of every API in a G2/G3 api_list."""
+    templates = {}
+    for api in api_list:
+        template = api.get("template_response")
+        if template:
+            templates[(api["tool_name"], change_name(standardize(api["api_name"])))] = template
+    return templates
+
+
+def project_fields(result, template):
+    """Keep the parts of result described by template; None when nothing matches."""
+    if isinstance(template, list):
+        if not template:
+            return result
+        if not isinstance(result, list):
+            return project_fields(result, template[0])
+        projected = [project_fields(item, template[0]) for item in result]
+        projected = [item for item in projected if item is not None]
+        return projected if projected else None
+    if isinstance(template, dict):
+        if isinstance(result, list):
+            # 模板只描述了单个对象，而接口返回的是对象列表
+            return project_fields(result, [template])
+        if not isinstance(result, dict):
+            return None
+        projected = {}
+        for key, sub_template in template.items():
+            if key == "_list_length" or key not in result:
+                continue
+            value = project_fields(result[key], sub_template)
+            # 模板写的是叶子类型（如 "str"）但实际值结构不符时，原样保留
+            projected[key] = result[key] if value is None else value
+        return projected if projected else None
+    return result
+
+
+def project_response(result, template):
+    """Project a call result onto its template_response schema, dropping unrelated bulk.
+
+    Results that do not match the schema at all are returned unchanged.
+    """
+    if isinstance(result, str):
+        try:
+            parsed = json.loads(result)
+        except ValueError:
+            return result
+        projected = project_fields(parsed, template)
+        return result if projected is None else projected
+    projected = project_fields(result, template)
+    return result if projected is None else projected
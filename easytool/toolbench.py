@@ -20,28 +20,20 @@ import re
 import importlib.util
 from sklearn.metrics.pairwise import cosine_similarity
 import pickle
+import time
 from .util import *
+from . import tool_replay, error_journal, tool_health
+from .tool_loader import load_tool_module
+from .api_resolver import APIResolver, closest_function, substituted_result
+from .param_validation import get_validator, reject, rejected_parameters
+from .tool_response import bounded_dumps, build_response_templates, project_response
+from .stage_planner import StagePlan, question_shape
+from .run_journal import preview
 from tqdm import tqdm
 
 openai.api_key = os.environ["OPENAI_API_KEY"]
 
 
-def get_last_processed_index(progress_file):
-    """Retrieve the last processed index from the progress file."""
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            last_index = f.read().strip()
-            return int(last_index) if last_index else 0
-    else:
-        return 0
-
-
-def update_progress(progress_file, index):
-    """Update the last processed index in the progress file."""
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        f.write(str(index))
-
-
 def choose_tool(question, Tool_dic, tool_used, model_name):
     """选择合适的工具来回答问题"""
     chat = ChatOpenAI(
@@ -345,57 +337,50 @@ def answer_check(question, answer, model_name):
 
 
 def Call_function(A, B, arg, index, id):
-    if A in index:
-        for path in index[A]:
-            app_path = os.path.join(path, A, 'api.py')
-            if os.path.isfile(app_path):
-                spec = importlib.util.spec_from_file_location('api', app_path)
-                app_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(app_module)
-                arg['toolbench_rapidapi_key'] = os.environ['RAPIDAPI_KEY']
-                # Check if B is a function in app
-                if hasattr(app_module, B):
-                    function_B = getattr(app_module, B)
+    start = time.time()
+    error_journal.count_call(A, B)
+    app_path = index.get(A)
+    if app_path is not None:
+        app_module = load_tool_module(app_path)
+        arg['toolbench_rapidapi_key'] = os.environ['RAPIDAPI_KEY']
+        # Check if B is a function in app
+        function_name = B
+        if not hasattr(app_module, B):
+            function_name = closest_function(app_module, B) or B
+            if function_name != B:
+                print(f"No function named {B} in {app_path}, calling {function_name} instead")
+        if hasattr(app_module, function_name):
+            function_B = getattr(app_module, function_name)
+            try:
+                call_result = function_B(**arg)
+                return substituted_result(call_result, B, function_name)
+            except Exception as e:
+                try:
+                    arg = {change_name(k.lower()): v for k, v in arg.items()}
+                    call_result = function_B(**arg)
+                    return substituted_result(call_result, B, function_name)
+                except Exception as e:
                     try:
+                        arg = {change_name(k.replace("-", "_")): v for k, v in arg.items()}
                         call_result = function_B(**arg)
-                        return call_result
+                        return substituted_result(call_result, B, function_name)
                     except Exception as e:
                         try:
-                            arg = {change_name(k.lower()): v for k, v in arg.items()}
+                            arg = {change_name(k.replace("\\", "")): v for k, v in arg.items()}
                             call_result = function_B(**arg)
-                            return call_result
+                            return substituted_result(call_result, B, function_name)
                         except Exception as e:
-                            try:
-                                arg = {change_name(k.replace("-", "_")): v for k, v in arg.items()}
-                                call_result = function_B(**arg)
-                                return call_result
-                            except Exception as e:
-                                try:
-                                    arg = {change_name(k.replace("\\", "")): v for k, v in arg.items()}
-                                    call_result = function_B(**arg)
-                                    return call_result
-                                except Exception as e:
-                                    print(f"Call function fails: {e}")
-                                    with open('wrong_log.json', 'a+', encoding='utf-8') as f:
-                                        line = json.dumps({
-                                            "id": id,
-                                            "parameters": arg,
-                                            "wrong": str(e)
-                                        }, ensure_ascii=False)
-                                        f.write(line + '\n')
-                                    return -1
-                else:
-                    with open('wrong_log.json', 'a+', encoding='utf-8') as f:
-                        line = json.dumps({
-                            "id": id,
-                            "parameters": arg,
-                            "wrong": f"No function named {B} in {app_path}"
-                        }, ensure_ascii=False)
-                        f.write(line + '\n')
-                    return (f"No function named {B} in {app_path}")
+                            print(f"Call function fails: {e}")
+                            error_journal.log_error(id, A, B, arg, e, time.time() - start)
+                            return -1
+        else:
+            error_journal.log_error(id, A, B, arg, AttributeError(f"No function named {B} in {app_path}"),
+                                    time.time() - start)
+            return (f"No function named {B} in {app_path}")
 
 
-def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, previous_log=None):
+def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, previous_log=None, templates=None,
+              resolver=None):
     tool_id = choose_tool(question, Tool_dic, tool_used, model_name)
     if tool_id == -1:
         return tool_id, "", "", "", ""
@@ -415,6 +400,10 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, pr
         print("No Calling")
         return tool_id, api_result, call_result, tool_instruction, API_instruction
     for api in api_selection:
+        if resolver is not None:
+            api = resolver.resolve(API_tool, api)
+            if api is None:
+                continue
         if previous_log is None:
             parameter = choose_parameter(API_instruction, api,
                                          tool_instruction["tool_guidelines"][api], question,
@@ -431,9 +420,27 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, pr
         call_result = ""
         return tool_id, api_result, call_result, tool_instruction, API_instruction
     if isinstance(api_result, set) or isinstance(api_result, list):
-        call_results = []
+        # 先收集同一子任务下的全部调用，再并发执行；结果按收集顺序拼接
+        call_jobs = []
+
+        def add_call_job(api, api_name, parameters):
+            # 参数不符合工具说明的调用在本地直接拒绝，不发起网络请求
+            api_key = api["api_name"]
+            validator = get_validator(API_tool, api_key, tool_instruction["tool_guidelines"].get(api_key))
+            parameters, errors = validator.validate(parameters)
+            if errors:
+                print(f"Invalid parameters for {api_name}: {errors}")
+                reject(api, parameters, errors)
+                error_journal.reject(ind, API_tool, api_name, parameters,
+                                     ValueError(f"Invalid parameters for {api_name}: {errors}"))
+                return
+            call_jobs.append((api_name, parameters))
+
         for api in api_result:
-            api_name = change_name(standardize(api["api_name"]))
+            if resolver is not None:
+                api_name = resolver.function_name(API_tool, api["api_name"])
+            else:
+                api_name = change_name(standardize(api["api_name"]))
 
             if isinstance(api["parameters"], dict):
                 parameters = {}
@@ -441,10 +448,7 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, pr
                     value = api["parameters"][key]
                     key = change_name(key)
                     parameters[key] = value
-                call_result = Call_function(API_tool, api_name, parameters, index, ind)
-                if call_result == -1:
-                    continue
-                call_results.append(str(call_result))
+                add_call_job(api, api_name, parameters)
             elif isinstance(api["parameters"], list):
                 for para_ls in api["parameters"]:
                     parameters = {}
@@ -452,10 +456,20 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, pr
                         value = para_ls[key]
                         key = change_name(key)
                         parameters[key] = value
-                    call_result = Call_function(API_tool, api_name, parameters, index, ind)
-                    if call_result == -1:
-                        continue
-                    call_results.append(str(call_result))
+                    add_call_job(api, api_name, parameters)
+
+        def call_job(job):
+            api_name, parameters = job
+            return tool_replay.call_pipeline(
+                API_tool, api_name, parameters, lambda: Call_function(API_tool, api_name, parameters, index, ind))
+
+        call_results = []
+        for (api_name, parameters), call_result in zip(call_jobs, parallel_map(call_job, call_jobs)):
+            if call_result == -1:
+                continue
+            if templates is not None and (API_tool, api_name) in templates:
+                call_result = project_response(call_result, templates[(API_tool, api_name)])
+            call_results.append(bounded_dumps(call_result, 1000))
         call_result = '\n\n'.join(call_results)
     elif isinstance(api_result, dict):
         api_name = change_name(standardize(api_result["api_name"]))
@@ -478,7 +492,7 @@ def retrieval(question, Tool_dic, dataset, tool_used, ind, model_name, index, pr
                 call_result = Call_function(API_tool, api_name, parameters, index, ind)
                 if call_result == -1:
                     continue
-                call_results.append(str(call_result))
+                call_results.append(bounded_dumps(call_result, 1000))
             call_result = '\n\n'.join(call_results)
 
     return tool_id, api_result, call_result, tool_instruction, API_instruction
@@ -664,18 +678,22 @@ def tool_check(task, model_name):
 
 
 def task_execution(data_type,
-                   base_path, index, dataset, test_data, progress_file,
+                   base_path, index, dataset, test_data, journal,
                    start_index, total_files, retrieval_num, ind, model_name):
+    resolver = APIResolver(dataset)
     with tqdm(total=total_files, desc="Processing files", initial=start_index) as pbar:
-        for i, data in enumerate(test_data[start_index:], start=start_index):
+        for i in journal.pending():
+            data = test_data[i]
             answer_ls = []
             question = data["query"]
             print(question)
+            templates = build_response_templates(data.get("api_list", []))
+            plan = StagePlan(question, model_name)
             temp = task_decompose(question, model_name)['Tasks']
             task_ls = []
             for t in range(len(temp)):
                 task_ls.append({"task": temp[t], "id": t + 1})
-            task_ls = task_topology(question, task_ls, model_name)
+            task_ls = plan.topology(task_ls, task_topology)
             task_depend = {}
             for task_dic in task_ls:
                 task_depend[task_dic['id']] = {'task': task_dic['task'], 'answer': ''}
@@ -683,6 +701,7 @@ def task_execution(data_type,
             api_result_ls = []
             call_result_ls = []
             tool_check_reason_ls = []
+            rejected_ls = []
             parameter_ls = []
             for task_dic in task_ls:
                 task = task_dic['task']
@@ -698,6 +717,7 @@ def task_execution(data_type,
                     tool_used = []
                     # 从dataset中生成Tool_dic，而不是从data中获取
                     Tool_dic = [{tool: dataset[str(tool)]["tool_description"]} for tool in dataset.keys()]
+                    Tool_dic = tool_health.filter_tools(Tool_dic, dataset)
                     for r in range(retrieval_num):
                         if depend_id[0] == -1:
                             tool_id, api_result, call_result, tool_instruction, API_instruction = retrieval(task,
@@ -706,7 +726,9 @@ def task_execution(data_type,
                                                                                                             tool_used,
                                                                                                             ind,
                                                                                                             model_name,
-                                                                                                            index)
+                                                                                                            index,
+                                                                                                            templates=templates,
+                                                                                                            resolver=resolver)
                             call_result = str(call_result)[:1000]
                             answer = answer_generation(task, API_instruction,
                                                        call_result, model_name)
@@ -721,13 +743,17 @@ def task_execution(data_type,
                                                                                                             ind,
                                                                                                             model_name,
                                                                                                             index,
-                                                                                                            previous_log=previous_log)
+                                                                                                            previous_log=previous_log,
+                                                                                                            templates=templates,
+                                                                                                            resolver=resolver)
                             call_result = str(call_result)[:1000]
                             answer = answer_generation_depend(task, API_instruction, call_result, model_name,
                                                               previous_log=previous_log)
 
+                        rejected_ls.extend(rejected_parameters(api_result))
                         check_index = answer_check(task, answer, model_name)
                         if check_index == 1:
+                            plan.passed_check(task, answer)
                             answer_task.append({'task': task, 'answer': answer})
                             api_result_ls.append(api_result)
                             call_result_ls.append(call_result)
@@ -740,28 +766,28 @@ def task_execution(data_type,
                                 continue
                             print('****Try Again****')
                 task_depend[task_dic['id']]['answer'] = answer
-            final_answer = answer_summarize(question, answer_task, model_name)
-            check_index = answer_check(question, final_answer, model_name)
-
-            ind = ind + 1
-            with open(f'''{data_type}_{model_name}_Easytool.jsonl''', 'a+', encoding='utf-8') as f:
-                line = json.dumps({
-                    "ID": ind,
-                    "question": question,
-                    "final_answer": final_answer,
-                    "subtask": task_ls,
-                    "answer_subtask": answer_task,
-                    "answer_wrong": answer_ls,
-                    "check_index": check_index,
-                    "execute_log": {
-                        "api_result_ls": api_result_ls,
-                        "parameter_ls": parameter_ls,
-                        "call_result_ls": call_result_ls,
-                        "tool_check_reason_ls": tool_check_reason_ls,
-                    }
-                }, ensure_ascii=False)
-                f.write(line + '\n')
-
-            print(final_answer)
-            update_progress(progress_file, i + 1)
+            final_answer = plan.summarize(answer_task, task_ls, answer_summarize)
+            check_index = plan.check(final_answer, answer_check)
+
+            ind = i + 1
+            journal.commit(i, {
+                "ID": ind,
+                "question": question,
+                "final_answer": final_answer,
+                "subtask": task_ls,
+                "answer_subtask": answer_task,
+                "answer_wrong": answer_ls,
+                "check_index": check_index,
+                "question_shape": question_shape(task_ls),
+                "skipped_stages": plan.skipped,
+                "execute_log": {
+                    "api_result_ls": api_result_ls,
+                    "parameter_ls": parameter_ls,
+                    "call_result_ls": call_result_ls,
+                    "tool_check_reason_ls": tool_check_reason_ls,
+                    "rejected_parameters": rejected_ls,
+                }
+            })
+
+            print(preview(final_answer))
             pbar.update(1)
@@ -1,7 +1,12 @@
 # — coding: utf-8 –
+import hashlib
 import json
 import re
 import os
+from . import async_tools
+
+# 工具索引等可重建的缓存文件放在这里，不写入工具目录
+CACHE_DIR = os.environ.get("EASYTOOL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "easytool"))
 
 
 def read_jsonline(address):
@@ -49,16 +54,65 @@ def lowercase_parameter_keys(input_dict):
     return input_dict
 
 
-def build_index(base_path):
+def scan_tool_dirs(base_path):
+    """Return {category_path: mtime} for the category folders directly under base_path."""
+    categories = {}
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                categories[entry.path] = entry.stat().st_mtime
+    return categories
+
+
+def build_index(base_path, cache_file=None):
+    """Map every tool name to its api.py path (layout: base_path/<category>/<tool>/api.py).
+
+    The index is persisted to cache_file (default: one file per tool root under CACHE_DIR) and
+    reused as long as the set of category folders and their mtimes are unchanged, so only a
+    changed tree is rescanned. A missing base_path gives an empty index.
+    """
+    if not os.path.isdir(base_path):
+        return {}
+    if cache_file is None:
+        root_hash = hashlib.sha1(os.path.abspath(base_path).encode("utf-8")).hexdigest()[:12]
+        cache_file = os.path.join(CACHE_DIR, f"tool_index_{root_hash}.json")
+    categories = scan_tool_dirs(base_path)
+    if os.path.exists(cache_file):
+        try:
+            cache = read_json(cache_file)
+            if cache["categories"] == categories:
+                return cache["index"]
+        except (ValueError, KeyError, OSError):
+            pass
+
     index = {}
-    for root, dirs, files in os.walk(base_path):
-        for dir_name in dirs:
-            if dir_name not in index:
-                index[dir_name] = []
-            index[dir_name].append(root)
+    for category_path in sorted(categories):
+        with os.scandir(category_path) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.name in index or not entry.is_dir():
+                    continue
+                app_path = os.path.join(entry.path, 'api.py')
+                if os.path.isfile(app_path):
+                    index[entry.name] = app_path
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        save_json({"categories": categories, "index": index}, cache_file)
+    except OSError as e:
+        print(f"Tool index cache not saved: {e}")
     return index
 
 
+def parallel_map(func, items, timeout=None):
+    """Apply func to every item on the tool executor (easytool.async_tools), keeping the input order.
+
+    Items that time out (timeout, default async_tools.TIMEOUT) give -1.
+    """
+    items = list(items)
+    if (len(items) <= 1 or async_tools.WORKERS <= 1) and not (timeout or async_tools.TIMEOUT):
+        return [func(item) for item in items]
+    return async_tools.map_calls(func, items, timeout)
+
+
 def change_name(name):
     change_list = ["from", "class", "return", "false", "true", "id", "and", "", "ID"]
     if name in change_list:
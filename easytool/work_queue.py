@@ -0,0 +1,218 @@
+# — coding: utf-8 –
+"""基于 SQLite 的租约式任务队列：任意多个 main.py 进程（--work_queue queue.db）从同一个队列中领取问题，
+按实际耗时动态分配，而不是像 --shard 那样事先固定划分。
+
+- 领取一个问题即获得有效期为 lease_seconds 的租约，后台心跳线程定期续约；
+- 问题的结果写入本进程自己的结果文件（*.worker-<id>.jsonl），fsync 之后才在队列中标记完成；
+- 进程崩溃或被杀后租约不再续期，过期后问题重新回到队列，由其他进程接手；
+- 跳过（分解失败等）的问题也提交一条带 "skipped" 的结果；没有提交结果的问题放回队列重试，累计 max_attempts 次后标记为 failed。
+
+多台机器共享时，队列文件需要放在支持文件锁的文件系统上。
+
+用法: python -m easytool.work_queue status queue.db
+      python -m easytool.work_queue merge G2_<model>_Easytool.jsonl
+"""
+import argparse
+import atexit
+import glob
+import os
+import socket
+import sqlite3
+import threading
+import time
+from .run_journal import FLUSH_INTERVAL, FLUSH_SIZE, ResultWriter, merge, scan
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 5.0
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def worker_path(path, worker):
+    """Result file of one worker, e.g. G2_gpt-4_Easytool.jsonl -> G2_gpt-4_Easytool.worker-host-123.jsonl."""
+    root, ext = os.path.splitext(path)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in worker)
+    return f"{root}.worker-{safe}{ext}"
+
+
+def worker_files(path):
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(glob.escape(root) + ".worker-*" + ext))
+
+
+class Connection:
+    """sqlite3 connection that is closed (not only committed) at the end of a with block."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+class WorkQueue:
+    """Question indices of one run (e.g. one result file) with their state: pending, leased, done or failed."""
+
+    def __init__(self, db_path, run, worker=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.run = run
+        self.worker = worker or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self.connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS tasks (run TEXT, idx INTEGER, state TEXT, worker TEXT, "
+                         "lease_until REAL, attempts INTEGER DEFAULT 0, PRIMARY KEY (run, idx))")
+
+    def connect(self):
+        # 每次操作使用新连接，心跳线程和结果写入线程都可以直接调用
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        return Connection(conn)
+
+    def add(self, total, done=()):
+        """Enqueue range(total) unless this run already has rows; indices in done start as done."""
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT OR IGNORE INTO tasks (run, idx, state) VALUES (?, ?, ?)",
+                             [(self.run, index, "done" if index in done else "pending") for index in range(total)])
+            conn.execute("COMMIT")
+
+    def acquire(self):
+        """Lease the next pending (or expired) index; waits while other workers hold live leases.
+
+        Returns None once every index is done or failed.
+        """
+        while True:
+            now = time.time()
+            with self.connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT idx, attempts FROM tasks WHERE run = ? AND (state = 'pending' OR "
+                                   "(state = 'leased' AND lease_until < ?)) ORDER BY idx LIMIT 1",
+                                   (self.run, now)).fetchone()
+                if row is not None and row[1] >= self.max_attempts:
+                    # 已经重试够次数（多半是每次都让进程崩溃的问题）
+                    conn.execute("UPDATE tasks SET state = 'failed', worker = NULL WHERE run = ? AND idx = ?",
+                                 (self.run, row[0]))
+                    conn.execute("COMMIT")
+                    continue
+                if row is not None:
+                    conn.execute("UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, "
+                                 "attempts = attempts + 1 WHERE run = ? AND idx = ?",
+                                 (self.worker, now + self.lease_seconds, self.run, row[0]))
+                    conn.execute("COMMIT")
+                    return row[0]
+                conn.execute("COMMIT")
+                earliest = conn.execute("SELECT MIN(lease_until) FROM tasks WHERE run = ? AND state = 'leased'",
+                                        (self.run,)).fetchone()[0]
+            if earliest is None:
+                return None
+            time.sleep(min(POLL_INTERVAL, max(earliest - now, 0) + 0.1))
+
+    def renew(self):
+        """Extend every lease this worker holds."""
+        with self.connect() as conn:
+            conn.execute("UPDATE tasks SET lease_until = ? WHERE run = ? AND worker = ? AND state = 'leased'",
+                         (time.time() + self.lease_seconds, self.run, self.worker))
+
+    def complete(self, indices):
+        with self.connect() as conn:
+            conn.executemany("UPDATE tasks SET state = 'done', worker = NULL WHERE run = ? AND idx = ?",
+                             [(self.run, index) for index in indices])
+
+    def release(self, index):
+        """Give up a lease without a result, so the index is retried (or failed after max_attempts)."""
+        with self.connect() as conn:
+            conn.execute("UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                         "worker = NULL WHERE run = ? AND idx = ? AND worker = ? AND state = 'leased'",
+                         (self.max_attempts, self.run, index, self.worker))
+
+    def counts(self):
+        with self.connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM tasks WHERE run = ? GROUP BY state",
+                                     (self.run,)).fetchall())
+
+
+class QueueJournal:
+    """RunJournal counterpart for --work_queue: questions come from the queue, results go to a per-worker file."""
+
+    def __init__(self, queue, path, total, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.queue = queue
+        self.path = worker_path(path, queue.worker)
+        self.indices = list(range(total))
+        # 没有使用队列时已经写入结果文件的问题不再执行
+        queue.add(total, done=scan(path)[0] if os.path.exists(path) else set())
+        self.committed = set()
+        self.writer = ResultWriter(self.path, flush_size, flush_interval, on_written=self.written)
+        self.stopped = threading.Event()
+        self.heartbeat = threading.Thread(target=self.beat, name="work-queue-heartbeat", daemon=True)
+        self.heartbeat.start()
+        atexit.register(self.close)
+
+    def beat(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            try:
+                self.queue.renew()
+            except sqlite3.Error as e:
+                print(f"Work queue heartbeat failed: {e}")
+
+    def completed(self):
+        return self.queue.counts().get("done", 0)
+
+    def pending(self):
+        """Indices leased from the queue one at a time, until it is empty."""
+        while True:
+            index = self.queue.acquire()
+            if index is None:
+                return
+            yield index
+            if index not in self.committed:
+                self.queue.release(index)
+
+    def commit(self, index, record):
+        self.committed.add(index)
+        self.writer.put({**record, "index": index})
+
+    def written(self, records):
+        try:
+            self.queue.complete([record["index"] for record in records])
+        except sqlite3.Error as e:
+            # 租约过期后会被重新执行，合并时去重
+            print(f"Work queue: could not mark {len(records)} results done: {e}")
+
+    def close(self):
+        self.writer.close()
+        self.stopped.set()
+        self.heartbeat.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a --work_queue database or merge the per-worker results")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    status = subparsers.add_parser('status', help="questions per state for every run in the queue")
+    status.add_argument('db_path')
+    merge_parser = subparsers.add_parser('merge', help="merge <result file>.worker-*.jsonl into <result file>")
+    merge_parser.add_argument('path')
+    args = parser.parse_args()
+    if args.command == 'status':
+        conn = sqlite3.connect(args.db_path)
+        rows = conn.execute("SELECT run, state, COUNT(*) FROM tasks GROUP BY run, state ORDER BY run, state").fetchall()
+        conn.close()
+        for run, state, count in rows:
+            print(f"{run:<60} {state:<8} {count:>6}")
+    else:
+        sources = worker_files(args.path)
+        written, missing = merge(args.path, sources)
+        print(f"{args.path}: {written} records from {len(sources)} worker files")
+        if missing:
+            print(f"no result for {len(missing)} questions: {missing[:20]}{' ...' if len(missing) > 20 else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,9 @@ import json
 import argparse
 import os
 from tqdm import tqdm
-from easytool import funcQA, restbench, toolbench_retrieve, toolbench
+from easytool import funcQA, restbench, toolbench_retrieve, toolbench, tool_cache, tool_replay, tool_health, async_tools
+from easytool.run_journal import RunJournal, parse_shard, shard_path
+from easytool.work_queue import WorkQueue, QueueJournal
 from easytool.util import *
 openai.api_key = os.environ["OPENAI_API_KEY"]
    
@@ -17,25 +19,71 @@ if __name__ == '__main__':
     parser.add_argument('--data_type', type=str, default='G3', help='G2 or G3 or funcqa_mh or funcqa_oh')
     parser.add_argument('--tool_root_dir', type=str, default='.toolenv/tools/')
     parser.add_argument('--retrieval_num', type=int, default=5)
+    parser.add_argument('--tool_cache', type=str, default=None, help='SQLite file for caching ToolBench call results')
+    parser.add_argument('--tool_cache_config', type=str, default=None,
+                        help='JSON with default_ttl, ttl, no_cache and max_entries for the tool cache')
+    parser.add_argument('--tool_replay', type=str, default=None, choices=['record', 'replay'],
+                        help='record ToolBench calls to --tool_replay_file, or serve them back offline')
+    parser.add_argument('--tool_replay_file', type=str, default='tool_replay.jsonl')
+    parser.add_argument('--replay_latency', type=str, default='0',
+                        help='seconds added to each replayed call, or "recorded" to reuse recorded latencies')
+    parser.add_argument('--replay_error_rate', type=float, default=0.0,
+                        help='fraction of replayed calls that fail as if the tool had returned -1')
+    parser.add_argument('--replay_seed', type=int, default=0)
+    parser.add_argument('--tool_health', type=str, default=None,
+                        help='JSON file with per-tool health scores; unhealthy tools are hidden from choose_tool')
+    parser.add_argument('--tool_health_recovery', type=float, default=600,
+                        help='seconds after its last failure before an unhealthy tool is offered again')
+    parser.add_argument('--tool_call_timeout', type=float, default=None,
+                        help='seconds before a ToolBench tool call counts as failed (default TOOL_CALL_TIMEOUT, none)')
+    parser.add_argument('--template_answers', action='store_true',
+                        help='FuncQA: answer numeric funchub results from a template and verify them locally '
+                             'instead of with answer_generation (answer_check still runs)')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='i/N: only run the questions with index %% N == i, into a per-shard result file; '
+                             'merge the shards with python -m easytool.run_journal <result file> --shards N')
+    parser.add_argument('--work_queue', type=str, default=None,
+                        help='SQLite file shared by any number of workers that lease questions from it; '
+                             'merge their results with python -m easytool.work_queue merge <result file>')
+    parser.add_argument('--worker_id', type=str, default=None, help='work queue worker name (default host-pid)')
+    parser.add_argument('--lease_seconds', type=float, default=300,
+                        help='a leased question goes back to the queue if its worker stops renewing for this long')
     
     args = parser.parse_args()
+    if args.shard and args.work_queue:
+        parser.error("--shard and --work_queue cannot be combined")
     
     if args.task == 'funcqa':
         dataset = read_json('data_funcqa/tool_instruction/functions_data.json')
         Tool_dic = read_jsonline('data_funcqa/tool_instruction/tool_dic.jsonl')
         test_data = read_json(f"data_funcqa/test_data/{args.data_type}.json")
         progress_file = f"FuncQA_{args.data_type}_{args.model_name}_Easytool.txt"
+        result_file = f"FuncQA_{args.data_type}_{args.model_name}_easytool.jsonl"
     
         
     elif 'toolbench' in args.task:
         base_path = args.tool_root_dir
+        # 工具目录不存在时索引为空（回放模式下所有调用都由录制文件应答，本地可以没有工具代码）
         index = build_index(base_path)
+        if args.tool_health:
+            tool_health.configure(args.tool_health, args.tool_health_recovery)
+        if args.tool_replay:
+            tool_replay.configure(args.tool_replay, args.tool_replay_file, args.replay_latency,
+                                  args.replay_error_rate, args.replay_seed)
+        if args.tool_cache:
+            tool_cache.configure(args.tool_cache, args.tool_cache_config)
+        if args.tool_call_timeout:
+            async_tools.configure(args.tool_call_timeout)
         dataset = read_json('data_toolbench/tool_instruction/toolbench_tool_instruction.json')
         if args.data_type == 'G2':
             test_data = read_json(f'''data_toolbench/test_data/{args.data_type}_category.json''')
         elif args.data_type == 'G3':
             test_data = read_json(f'''data_toolbench/test_data/{args.data_type}_instruction.json''')
         progress_file = f'''{args.data_type}_{args.model_name}_Easytool.txt'''
+        if args.task == 'toolbench_retrieve':
+            result_file = f'''{args.data_type}_{args.model_name}_retrieve_Easytool.jsonl'''
+        else:
+            result_file = f'''{args.data_type}_{args.model_name}_Easytool.jsonl'''
         
     
     elif args.task == 'restbench':
@@ -45,13 +93,22 @@ if __name__ == '__main__':
             dic_tool[data['ID']] = data
         test_data = read_json('data_restbench/test_data/tmdb.json')
         progress_file = f"restbench_{args.model_name}_Easytool.txt"
+        result_file = f"restbench_{args.model_name}_Easytool.jsonl"
 
     else:
         print("Wrong task name")
         exit()  
         
-    start_index = get_last_processed_index(progress_file)
-    total_files = len(test_data)
+    # 结果文件同时是运行日志：已提交的问题不再执行，progress_file 只用于接续旧版本留下的结果
+    if args.work_queue:
+        queue = WorkQueue(args.work_queue, os.path.basename(result_file), args.worker_id, args.lease_seconds)
+        journal = QueueJournal(queue, result_file, len(test_data))
+    elif args.shard:
+        journal = RunJournal(shard_path(result_file, args.shard), len(test_data), shard=args.shard)
+    else:
+        journal = RunJournal(result_file, len(test_data), legacy_progress_file=progress_file)
+    total_files = len(journal.indices)
+    start_index = journal.completed()
     retrieval_num = args.retrieval_num
     ind = start_index
     model_name = args.model_name
@@ -60,33 +117,34 @@ if __name__ == '__main__':
     if args.data_type == 'funcqa_mh':
         funcQA.task_execution_mh(args.data_type, start_index, total_files, 
                                         retrieval_num, ind, model_name, dataset, 
-                                        Tool_dic, test_data, progress_file)
+                                        Tool_dic, test_data, journal, args.template_answers)
     elif args.data_type == 'funcqa_oh':
         funcQA.task_execution_oh(args.data_type, start_index, total_files, 
                                         retrieval_num, ind, model_name, dataset, 
-                                        Tool_dic, test_data, progress_file)
+                                        Tool_dic, test_data, journal, args.template_answers)
         
         
     elif args.task == 'toolbench_retrieve':
         toolbench_retrieve.task_execution(args.data_type,
-            base_path, index, dataset, test_data, progress_file, 
+            base_path, index, dataset, test_data, journal, 
             start_index, total_files, retrieval_num, ind, model_name)
 
         
     
     elif args.task == 'toolbench':
         toolbench.task_execution(args.data_type,
-            base_path, index, dataset, test_data, progress_file, 
+            base_path, index, dataset, test_data, journal, 
             start_index, total_files, retrieval_num, ind, model_name)
 
         
     
     elif args.task == 'restbench':
         restbench.task_execution(
-            Tool_dic, dic_tool, test_data, progress_file, 
+            Tool_dic, dic_tool, test_data, journal, 
             start_index, total_files, retrieval_num, ind, model_name)
 
     
     else:
         print("Wrong task name")
         exit()
+    journal.close()
@@ -0,0 +1,25 @@
+import types
+
+from easytool.api_resolver import closest_function, substituted_result
+
+
+def make_module(*names):
+    module = types.ModuleType("api")
+    for name in names:
+        func = lambda **kwargs: kwargs
+        func.__module__ = module.__name__
+        setattr(module, name, func)
+    return module
+
+
+def test_closest_function_only_accepts_near_identical_names():
+    module = make_module("search_users", "get_user_by_name", "get_weather_forecast")
+    assert closest_function(module, "search_user") == "search_users"
+    assert closest_function(module, "get_user_by_id") is None
+    assert closest_function(module, "get_weather") is None
+
+
+def test_substituted_result_names_the_called_function():
+    assert substituted_result({"a": 1}, "search_users", "search_users") == {"a": 1}
+    assert substituted_result({"a": 1}, "search_user", "search_users") == {
+        "requested_function": "search_user", "called_function": "search_users", "result": {"a": 1}}
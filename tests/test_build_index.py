@@ -0,0 +1,22 @@
+import os
+
+from easytool.util import build_index
+
+
+def test_missing_tool_root_gives_empty_index(tmp_path):
+    assert build_index(str(tmp_path / "missing"), str(tmp_path / "index.json")) == {}
+
+
+def test_index_cache_lives_outside_tool_root(tmp_path, monkeypatch):
+    tool_root = tmp_path / "tools"
+    (tool_root / "Data" / "weather").mkdir(parents=True)
+    (tool_root / "Data" / "weather" / "api.py").write_text("", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr("easytool.util.CACHE_DIR", str(cache_dir))
+    expected = {"weather": os.path.join(str(tool_root), "Data", "weather", "api.py")}
+    assert build_index(str(tool_root)) == expected
+    assert sorted(os.listdir(tool_root)) == ["Data"]
+    assert len(os.listdir(cache_dir)) == 1
+    # 缓存目录不可写时照常返回索引
+    monkeypatch.setattr("easytool.util.CACHE_DIR", str(tool_root / "Data" / "weather" / "api.py"))
+    assert build_index(str(tool_root)) == expected
@@ -0,0 +1,31 @@
+import json
+
+from easytool.error_journal import ErrorJournal, summarize
+
+
+def test_counts_go_to_stats_file_and_match_failures(tmp_path):
+    log = tmp_path / "wrong_log.json"
+    journal = ErrorJournal(str(log), flush_interval=0.05)
+    for i in range(4):
+        journal.count_call("tool", "api")
+    journal.log_error(1, "tool", "api", {"q": "a"}, RuntimeError("boom"))
+    # 参数校验拒绝的调用也计入调用次数
+    journal.reject(2, "tool", "api", {"q": "b"}, ValueError("Invalid parameters"))
+    journal.close()
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    assert [record["status"] for record in records] == ["error", "error"]
+    assert all("wrong" in record for record in records)
+    stats = json.loads((tmp_path / "wrong_log_stats.json").read_text(encoding="utf-8"))
+    assert stats == {"tool": {"api": {"calls": 5, "failures": 2}}}
+
+    row, = summarize(str(log))
+    assert (row["calls"], row["failures"], row["failure_rate"]) == (5, 2, 0.4)
+    assert row["exceptions"] == {"RuntimeError": 1, "ValueError": 1}
+
+
+def test_summarize_without_stats_file(tmp_path):
+    log = tmp_path / "wrong_log.json"
+    log.write_text(json.dumps({"id": 1, "parameters": {}, "wrong": "old format"}) + "\n", encoding="utf-8")
+    row, = summarize(str(log))
+    assert (row["tool"], row["calls"], row["failures"], row["failure_rate"]) == ("unknown", None, 1, None)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from easytool.funchub_batch import call_batch, load_funchub
+
+# 结果舍入为零的负数，两种引擎都应输出 "0"
+NEGATIVE_ZERO = [
+    ("subtract_", [0.001, 0.002]),
+    ("multiply_", [-0.001, 1]),
+    ("multiply_", [-0.0, 1]),
+    ("divide_", [-1, 1000]),
+    ("divide_", [-1, 10 ** 9]),
+    ("add_", [-0.004, 0.0001]),
+]
+
+
+@pytest.mark.parametrize("name, args", NEGATIVE_ZERO)
+def test_engines_agree_on_negative_zero(name, args):
+    function = getattr(load_funchub(), name)
+    assert function(args, engine="float") == function(args, engine="decimal") == "0"
+
+
+@pytest.mark.parametrize("name", sorted({name for name, _ in NEGATIVE_ZERO}))
+def test_batch_matches_scalar_on_negative_zero(name):
+    rows = [args for other, args in NEGATIVE_ZERO if other == name]
+    function = getattr(load_funchub(), name)
+    assert list(call_batch(name, rows)) == [function(args, engine="float") for args in rows]
@@ -0,0 +1,55 @@
+import pytest
+
+from easytool import tool_cache, tool_health, tool_replay
+
+
+@pytest.fixture(autouse=True)
+def reset_pipeline(monkeypatch):
+    monkeypatch.setattr(tool_cache, "_cache", None)
+    monkeypatch.setattr(tool_health, "_health", None)
+    monkeypatch.setattr(tool_replay, "_mode", None)
+    yield
+    if tool_cache._cache is not None:
+        tool_cache._cache.close()
+    if tool_replay._record_file is not None:
+        tool_replay._record_file.close()
+
+
+def test_record_with_cache_then_replay_without_cache(tmp_path):
+    recording = tmp_path / "replay.jsonl"
+    calls = []
+
+    def tool(query):
+        arg = {"q": query}
+
+        def call():
+            calls.append(arg["q"])
+            return {"answer": arg["q"].upper()}
+        return tool_replay.call_pipeline("tool", "api", arg, call)
+
+    tool_replay.configure("record", str(recording))
+    tool_cache.configure(str(tmp_path / "cache.db"))
+    assert tool("a") == {"answer": "A"}
+    # 第二次由缓存应答，但仍然写入录制文件
+    assert tool("a") == {"answer": "A"}
+    assert tool("b") == {"answer": "B"}
+    assert calls == ["a", "b"]
+    tool_replay._record_file.close()
+    assert len(recording.read_text(encoding="utf-8").splitlines()) == 3
+
+    tool_cache._cache.close()
+    tool_cache._cache = None
+    tool_replay.configure("replay", str(recording))
+    assert tool("a") == {"answer": "A"}
+    assert tool("b") == {"answer": "B"}
+    assert calls == ["a", "b"]
+
+
+def test_replay_does_not_update_tool_health(tmp_path):
+    recording = tmp_path / "replay.jsonl"
+    recording.write_text("", encoding="utf-8")
+    health = tool_health._health = tool_health.ToolHealth(str(tmp_path / "health.json"))
+    tool_replay.configure("replay", str(recording), error_rate=1.0)
+    for _ in range(5):
+        assert tool_replay.call_pipeline("tool", "api", {"q": "a"}, lambda: {"answer": "A"}) == -1
+    assert health.tools == {}